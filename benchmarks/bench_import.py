@@ -0,0 +1,69 @@
+"""Measure the cold-start cost of importing googlewifi.
+
+Each scenario runs in a fresh interpreter, so nothing is cached between runs.
+Run from the repository root:
+
+  python benchmarks/bench_import.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("aiohttp", "grpc", "dateutil", "ghome_foyer_api", "numpy")
+
+SCENARIOS = (
+  ("import googlewifi", "import googlewifi"),
+  ("exceptions only", "from googlewifi import GoogleWifiException"),
+  ("REST client", "from googlewifi import GoogleWifi"),
+  ("coordinator", "from googlewifi import GoogleWifiCoordinator"),
+  # What the first refresh_tokens() call adds on top of the REST client.
+  ("with gRPC", "from googlewifi import GoogleWifi; import grpc.aio; import ghome_foyer_api.api_pb2_grpc"),
+)
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+def run_scenario(statement:str, runs:int):
+  """Return the import times of a statement and the heavy modules it loaded."""
+  code = PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+  times = []
+  loaded = []
+
+  for _ in range(runs):
+    output = subprocess.run(
+      [sys.executable, "-c", code],
+      cwd=ROOT,
+      check=True,
+      capture_output=True,
+      text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    times.append(result["seconds"])
+    loaded = result["loaded"]
+
+  return times, loaded
+
+def main(args):
+  """Run every scenario and print a report."""
+  print(f"{'scenario':>16} {'p50 ms':>8} {'min ms':>8} {'max ms':>8}  heavy modules loaded")
+  for name, statement in SCENARIOS:
+    times, loaded = run_scenario(statement, args.runs)
+    print(
+      f"{name:>16} {statistics.median(times) * 1000:>8.1f} {min(times) * 1000:>8.1f} "
+      f"{max(times) * 1000:>8.1f}  {', '.join(loaded) or '-'}"
+    )
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario")
+  main(parser.parse_args())
@@ -0,0 +1,129 @@
+"""Benchmark GoogleWifi refreshes against the local fake Foyer API.
+
+Run from the repository root:
+
+  python benchmarks/bench_refresh.py --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from googlewifi import GoogleWifi
+from fake_foyer import FakeFoyer
+
+TOPOLOGIES = (
+  (1, 3, 20),
+  (4, 3, 50),
+  (16, 3, 100),
+  (64, 3, 100),
+)
+
+async def bench_topology(systems:int, access_points:int, stations:int, args):
+  """Measure get_systems() for one topology and return a result row."""
+  fake = FakeFoyer(
+    systems=systems,
+    access_points=access_points,
+    stations=stations,
+    latency=args.latency,
+    jitter=args.jitter,
+    failure_rate=args.failure_rate,
+    operation_duration=args.operation_duration,
+    seed=1,
+  )
+  await fake.start()
+  client = fake.configure(GoogleWifi("fake-refresh-token", max_concurrency=args.concurrency))
+
+  try:
+    tracemalloc.start()
+    started = time.perf_counter()
+    await client.get_systems()
+    cold = time.perf_counter() - started
+    cold_requests = sum(fake.requests.values())
+
+    fake.requests.clear()
+    warm = []
+    for _ in range(args.rounds):
+      started = time.perf_counter()
+      await client.get_systems()
+      warm.append(time.perf_counter() - started)
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+      "topology": f"{systems}x{access_points}x{stations}",
+      "cold_s": cold,
+      "cold_requests": cold_requests,
+      "warm_p50_s": statistics.median(warm),
+      "warm_max_s": max(warm),
+      "warm_requests": sum(fake.requests.values()) / args.rounds,
+      "peak_mib": peak / 1048576,
+    }
+  finally:
+    await client.close()
+    await fake.stop()
+
+async def bench_speed_test(args):
+  """Measure run_speed_test() end to end."""
+  fake = FakeFoyer(latency=args.latency, operation_duration=args.operation_duration)
+  await fake.start()
+  client = fake.configure(GoogleWifi("fake-refresh-token"))
+
+  try:
+    await client.connect()
+    started = time.perf_counter()
+    await client.run_speed_test("system-0")
+    return time.perf_counter() - started, sum(fake.requests.values())
+  finally:
+    await client.close()
+    await fake.stop()
+
+async def bench_bluetooth(args):
+  """Measure scan_bluetooth() across several speakers."""
+  fake = FakeFoyer(latency=args.latency)
+  await fake.start()
+  client = fake.configure(GoogleWifi("fake-refresh-token"))
+
+  try:
+    speakers = [("127.0.0.1", f"token-{number}") for number in range(args.speakers)]
+    started = time.perf_counter()
+    await client.scan_bluetooth(speakers, timeout=1, poll_interval=0.2)
+    return time.perf_counter() - started, sum(fake.requests.values())
+  finally:
+    await client.close()
+    await fake.stop()
+
+async def main(args):
+  """Run every benchmark and print a report."""
+  print(f"{'topology':>12} {'cold s':>8} {'cold req':>9} {'warm p50 s':>11} {'warm max s':>11} {'warm req':>9} {'peak MiB':>9}")
+  for systems, access_points, stations in TOPOLOGIES[:args.topologies]:
+    row = await bench_topology(systems, access_points, stations, args)
+    print(
+      f"{row['topology']:>12} {row['cold_s']:>8.3f} {row['cold_requests']:>9} "
+      f"{row['warm_p50_s']:>11.3f} {row['warm_max_s']:>11.3f} {row['warm_requests']:>9.1f} "
+      f"{row['peak_mib']:>9.2f}"
+    )
+
+  elapsed, requests = await bench_speed_test(args)
+  print(f"run_speed_test: {elapsed:.3f} s, {requests} requests")
+
+  elapsed, requests = await bench_bluetooth(args)
+  print(f"scan_bluetooth ({args.speakers} speakers): {elapsed:.3f} s, {requests} requests")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--rounds", type=int, default=5, help="warm refreshes per topology")
+  parser.add_argument("--topologies", type=int, default=len(TOPOLOGIES), help="number of topologies to run")
+  parser.add_argument("--concurrency", type=int, default=4, help="GoogleWifi max_concurrency")
+  parser.add_argument("--latency", type=float, default=0.0, help="injected latency per request in seconds")
+  parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency in seconds")
+  parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+  parser.add_argument("--operation-duration", type=float, default=0.5, help="seconds until fake operations finish")
+  parser.add_argument("--speakers", type=int, default=8, help="speakers for the bluetooth benchmark")
+  asyncio.run(main(parser.parse_args()))
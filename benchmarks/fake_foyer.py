@@ -0,0 +1,311 @@
+"""Local stand-in for the Google Wifi (Foyer v2) API used by the benchmarks."""
+import argparse
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import random
+import time
+
+from aiohttp import web
+
+class FakeFoyer:
+  """Serve the Foyer v2, OAuth and local Google Home endpoints from memory."""
+
+  def __init__(
+    self,
+    systems:int = 1,
+    access_points:int = 3,
+    stations:int = 20,
+    latency:float = 0.0,
+    jitter:float = 0.0,
+    failure_rate:float = 0.0,
+    operation_duration:float = 0.5,
+    seed:int = None,
+    ):
+    """Build a topology of systems, access points and stations."""
+    self.latency = latency
+    self.jitter = jitter
+    self.failure_rate = failure_rate
+    self.operation_duration = operation_duration
+    self.requests = collections.Counter()
+    self.failing = set()
+    self.revoked_tokens = set()
+    self.scripted = collections.defaultdict(collections.deque)
+    self.overrides = {}
+    self._token_ids = itertools.count(1)
+    self.bytes_sent = 0
+    self._random = random.Random(seed)
+    self._operation_ids = itertools.count(1)
+    self._operations = {}
+    self._runner = None
+    self.url = None
+
+    self.groups = {}
+    self.stations = {}
+    self.paused = {}
+
+    for system_number in range(systems):
+      system_id = f"system-{system_number}"
+      ap_ids = [f"{system_id}-ap-{ap_number}" for ap_number in range(access_points)]
+      self.groups[system_id] = {
+        "id": system_id,
+        "groupSettings": {"familyHubSettings": {"stationPolicies": []}},
+        "accessPoints": [{"id": ap_id} for ap_id in ap_ids],
+      }
+      self.stations[system_id] = [
+        {
+          "id": f"{system_id}-station-{station_number}",
+          "friendlyName": f"Station {station_number}",
+          "connected": True,
+          "ipAddresses": [f"192.168.{system_number % 256}.{station_number % 254 + 1}"],
+          "apId": ap_ids[station_number % access_points],
+        }
+        for station_number in range(stations)
+      ]
+
+  def app(self):
+    """Return the aiohttp application."""
+    app = web.Application(middlewares=[self._middleware])
+    app.router.add_post("/oauth2/v4/token", self.oauth_token)
+    app.router.add_post("/v1/issuetoken", self.issue_token)
+    app.router.add_get("/v2/groups", self.get_groups)
+    app.router.add_get("/v2/groups/{system_id}/status", self.get_status)
+    app.router.add_get("/v2/groups/{system_id}/stations", self.get_stations)
+    app.router.add_get("/v2/groups/{system_id}/realtimeMetrics", self.get_realtime_metrics)
+    app.router.add_post("/v2/groups/{system_id}/stations/operations/sensitiveInfo", self.start_sensitive_info)
+    app.router.add_get("/v2/operations/{operation_id}", self.get_operation)
+    app.router.add_get("/v2/operations/{operation_id}/sensitiveInfo", self.get_sensitive_info)
+    app.router.add_put("/v2/groups/{system_id}/stationBlocking", self.station_blocking)
+    app.router.add_put("/v2/groups/{system_id}/prioritizedStation", self.start_operation)
+    app.router.add_delete("/v2/groups/{system_id}/prioritizedStation", self.start_operation)
+    app.router.add_post("/v2/groups/{system_id}/reboot", self.start_operation)
+    app.router.add_post("/v2/groups/{system_id}/wanSpeedTest", self.start_operation)
+    app.router.add_get("/v2/groups/{system_id}/speedTestResults", self.speed_test_results)
+    app.router.add_put("/v2/accesspoints/{ap_id}/lighting", self.start_operation)
+    app.router.add_post("/v2/accesspoints/{ap_id}/reboot", self.start_operation)
+    app.router.add_get("/setup/eureka_info", self.eureka_info)
+    app.router.add_get("/setup/bluetooth/status", self.bluetooth_status)
+    app.router.add_post("/setup/bluetooth/scan", self.bluetooth_scan)
+    app.router.add_get("/setup/bluetooth/scan_results", self.bluetooth_scan_results)
+    return app
+
+  async def start(self, host:str = "127.0.0.1", port:int = 0):
+    """Start serving and return the base URL."""
+    self._runner = web.AppRunner(self.app())
+    await self._runner.setup()
+    site = web.TCPSite(self._runner, host, port)
+    await site.start()
+    port = self._runner.addresses[0][1]
+    self.url = f"http://{host}:{port}"
+    return self.url
+
+  async def stop(self):
+    """Stop serving."""
+    if self._runner:
+      await self._runner.cleanup()
+      self._runner = None
+
+  def configure(self, client):
+    """Point a GoogleWifi client at this server."""
+    client.foyer_url = f"{self.url}/v2"
+    client.oauth_url = f"{self.url}/oauth2/v4/token"
+    client.issue_token_url = f"{self.url}/v1/issuetoken"
+    client.local_url = self.url.replace("127.0.0.1", "{host}") + "/setup"
+    return client
+
+  @web.middleware
+  async def _middleware(self, request, handler):
+    """Count requests, inject latency, reject revoked tokens, play scripted errors and fail a share of requests."""
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+    self.requests[f"{request.method} {route}"] += 1
+
+    delay = self.latency + self._random.uniform(0, self.jitter)
+    if delay:
+      await asyncio.sleep(delay)
+
+    authorization = request.headers.get("Authorization", "")
+    if request.path.startswith("/v2/") and authorization[len("Bearer "):] in self.revoked_tokens:
+      return self._json({"error": {"code": 401, "status": "UNAUTHENTICATED"}}, status=401)
+
+    if self.scripted.get(request.path):
+      status, retry_after = self.scripted[request.path].popleft()
+      response = self._json({"error": {"code": status}}, status=status)
+      if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+      return response
+
+    if request.path in self.overrides:
+      return self._json(self.overrides[request.path])
+
+    if any(path in request.path for path in self.failing):
+      return self._json({"error": {"code": 503, "status": "UNAVAILABLE"}}, status=503)
+
+    if self.failure_rate and self._random.random() < self.failure_rate:
+      return self._json({"error": {"code": 503, "status": "UNAVAILABLE"}}, status=503)
+
+    return await handler(request)
+
+  def _json(self, payload, status:int = 200):
+    """Return a JSON response and count its size."""
+    body = json.dumps(payload).encode()
+    self.bytes_sent += len(body)
+    return web.Response(body=body, status=status, content_type="application/json")
+
+  def _new_operation(self, result=None):
+    """Create an operation that finishes after operation_duration."""
+    operation_id = f"operation-{next(self._operation_ids)}"
+    self._operations[operation_id] = (time.monotonic() + self.operation_duration, result)
+    return {"operation": {"operationId": operation_id, "operationState": "CREATED"}}
+
+  async def oauth_token(self, request):
+    return self._json({"access_token": "fake-access-token", "expires_in": 3599})
+
+  async def issue_token(self, request):
+    return self._json({"token": f"fake-api-token-{next(self._token_ids)}", "expiresIn": "3599"})
+
+  async def get_groups(self, request):
+    return self._json({"groups": list(self.groups.values())})
+
+  async def get_status(self, request):
+    system_id = request.match_info["system_id"]
+    return self._json({
+      "wanConnectionStatus": "ONLINE",
+      "apStatuses": [
+        {"apId": this_ap["id"], "apState": "AP_ONLINE"}
+        for this_ap in self.groups[system_id]["accessPoints"]
+      ],
+    })
+
+  async def get_stations(self, request):
+    return self._json({"stations": self.stations[request.match_info["system_id"]]})
+
+  async def get_realtime_metrics(self, request):
+    system_id = request.match_info["system_id"]
+    station_metrics = [
+      {
+        "station": {"id": station["id"]},
+        "traffic": {
+          "transmitSpeedBps": str(self._random.randint(0, 10_000_000)),
+          "receiveSpeedBps": str(self._random.randint(0, 50_000_000)),
+        },
+      }
+      for station in self.stations[system_id]
+    ]
+    return self._json({
+      "groupTraffic": {
+        "transmitSpeedBps": str(self._random.randint(0, 100_000_000)),
+        "receiveSpeedBps": str(self._random.randint(0, 500_000_000)),
+      },
+      "stationMetrics": station_metrics,
+    })
+
+  async def start_sensitive_info(self, request):
+    payload = await request.json()
+    result = {
+      "stationSensitiveInfos": [
+        {"stationId": station_id, "macAddress": _fake_mac(station_id)}
+        for station_id in payload.get("stationIds", [])
+      ]
+    }
+    return self._json(self._new_operation(result))
+
+  async def get_operation(self, request):
+    operation_id = request.match_info["operation_id"]
+    if operation_id not in self._operations:
+      return self._json({"error": {"code": 404, "status": "NOT_FOUND"}}, status=404)
+
+    done_at = self._operations[operation_id][0]
+    state = "DONE" if time.monotonic() >= done_at else "IN_PROGRESS"
+    return self._json({"operationId": operation_id, "operationState": state})
+
+  async def get_sensitive_info(self, request):
+    result = self._operations.get(request.match_info["operation_id"], (0, None))[1]
+    return self._json(result or {})
+
+  async def station_blocking(self, request):
+    system_id = request.match_info["system_id"]
+    payload = await request.json()
+    policies = self.groups[system_id]["groupSettings"]["familyHubSettings"]["stationPolicies"]
+    policies[:] = [policy for policy in policies if policy["stationId"] != payload["stationId"]]
+
+    if payload.get("blocked") == "true":
+      policies.append({
+        "stationId": payload["stationId"],
+        "blockingPolicy": {"expiryTimestamp": "1970-01-01T00:00:00Z"},
+      })
+
+    return self._json(self._new_operation())
+
+  async def start_operation(self, request):
+    return self._json(self._new_operation())
+
+  async def speed_test_results(self, request):
+    count = int(request.query.get("maxResultCount", 1))
+    now = int(time.time())
+    return self._json({
+      "speedTestResults": [
+        {
+          "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - number * 3600)),
+          "speedTestResultData": {
+            "downloadSpeedKbps": str(self._random.randint(50_000, 1_000_000)),
+            "uploadSpeedKbps": str(self._random.randint(10_000, 100_000)),
+          },
+        }
+        for number in range(count)
+      ]
+    })
+
+  async def eureka_info(self, request):
+    return self._json({"name": "Fake Google Home", "device_info": {"cloud_device_id": "fake-device"}})
+
+  async def bluetooth_status(self, request):
+    return self._json({"scanning_enabled": False, "discovery_enabled": False})
+
+  async def bluetooth_scan(self, request):
+    return self._json({})
+
+  async def bluetooth_scan_results(self, request):
+    return self._json([
+      {
+        "mac_address": _fake_mac(f"bluetooth-{number}"),
+        "name": f"Bluetooth {number}",
+        "rssi": self._random.randint(-90, -30),
+        "device_class": 0,
+        "expected_profiles": 0,
+      }
+      for number in range(10)
+    ])
+
+def _fake_mac(seed:str):
+  """Return a stable fake MAC address for an id."""
+  digest = hashlib.md5(seed.encode()).digest()
+  return ":".join(f"{byte:02x}" for byte in digest[:6])
+
+async def _serve(args):
+  """Serve until interrupted."""
+  fake = FakeFoyer(
+    systems=args.systems,
+    access_points=args.access_points,
+    stations=args.stations,
+    latency=args.latency,
+    failure_rate=args.failure_rate,
+  )
+  url = await fake.start(port=args.port)
+  print(f"Fake Foyer API listening on {url}")
+
+  try:
+    await asyncio.Event().wait()
+  finally:
+    await fake.stop()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--port", type=int, default=8080)
+  parser.add_argument("--systems", type=int, default=1)
+  parser.add_argument("--access-points", type=int, default=3)
+  parser.add_argument("--stations", type=int, default=20)
+  parser.add_argument("--latency", type=float, default=0.0)
+  parser.add_argument("--failure-rate", type=float, default=0.0)
+  asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,176 @@
+"""OAuth and Foyer API token management."""
+import asyncio
+import time
+
+import aiohttp
+
+from .exceptions import (
+  GoogleWifiAuthError,
+  GoogleWifiException,
+  GoogleWifiHTTPError,
+  GoogleWifiRateLimited,
+)
+
+class TokenManager:
+  """Keep the OAuth access token and the Foyer API token valid."""
+
+  def __init__(self, client, refresh_margin:float = 300):
+    """Set up the token manager for a GoogleWifi client."""
+    self._client = client
+    self._refresh_margin = refresh_margin
+    self._lock = None
+    self._refresh_task = None
+    self.access_token = None
+    self.access_token_refresh_at = None
+    self.api_token = None
+    self.api_token_refresh_at = None
+    self.headers = None
+
+  def _valid(self, token, refresh_at):
+    """Return True if a token is set and not yet due for renewal."""
+    return bool(token) and time.monotonic() < refresh_at
+
+  def _refresh_at(self, response, default:float = 3600):
+    """Return when a token from an expires_in style response is due for renewal."""
+    expires_in = response.get("expires_in", response.get("expiresIn", default))
+
+    try:
+      expires_in = float(expires_in)
+    except (TypeError, ValueError):
+      expires_in = default
+
+    return time.monotonic() + expires_in - min(self._refresh_margin, expires_in / 2)
+
+  async def _token_request(self, url:str, headers:dict, payload:str):
+    """Post a token request, reporting a rejected token as GoogleWifiAuthError."""
+    try:
+      return await self._client._request("POST", url, headers=headers, data=payload)
+    except GoogleWifiRateLimited:
+      raise
+    except GoogleWifiHTTPError as error:
+      if 400 <= error.status < 500:
+        raise GoogleWifiAuthError(error) from error
+      raise
+
+  async def get_access_token(self):
+    """Exchange the refresh token for an OAuth access token."""
+    url = self._client.oauth_url
+    payload = f"client_id=936475272427.apps.googleusercontent.com&grant_type=refresh_token&refresh_token={self._client._refresh_token}"
+    headers = {
+      'Content-Type': 'application/x-www-form-urlencoded'
+    }
+
+    response = await self._token_request(url, headers, payload)
+
+    self.access_token = response.get("access_token", None)
+    self.access_token_refresh_at = self._refresh_at(response)
+
+  async def get_api_token(self):
+    """Exchange the access token for a Foyer API token."""
+    oath_url = self._client.issue_token_url
+    payload = "app_id=com.google.OnHub&client_id=586698244315-vc96jg3mn4nap78iir799fc2ll3rk18s.apps.googleusercontent.com&hl=en-US&lib_ver=3.3&response_type=token&scope=https%3A//www.googleapis.com/auth/accesspoints%20https%3A//www.googleapis.com/auth/clouddevices"
+    headers = {
+      'Authorization': f"Bearer {self.access_token}",
+      'Content-Type': 'application/x-www-form-urlencoded'
+    }
+
+    response = await self._token_request(oath_url, headers, payload)
+
+    self.api_token = response.get("token", None)
+    self.api_token_refresh_at = self._refresh_at(response)
+    self.headers = {
+      "Content-Type": "application/json; charset=utf-8",
+      "Authorization": f"Bearer {self.api_token}",
+    }
+
+  def snapshot(self):
+    """Return the tokens with their renewal times as Unix timestamps."""
+    offset = time.time() - time.monotonic()
+
+    return {
+      "access_token": self.access_token,
+      "access_token_refresh_at": (
+        self.access_token_refresh_at + offset if self.access_token_refresh_at else None
+      ),
+      "api_token": self.api_token,
+      "api_token_refresh_at": (
+        self.api_token_refresh_at + offset if self.api_token_refresh_at else None
+      ),
+    }
+
+  def restore(self, state:dict):
+    """Reuse tokens from snapshot() that are not yet due for renewal."""
+    offset = time.time() - time.monotonic()
+
+    access_token_refresh_at = (state.get("access_token_refresh_at") or 0) - offset
+    if self._valid(state.get("access_token"), access_token_refresh_at):
+      self.access_token = state["access_token"]
+      self.access_token_refresh_at = access_token_refresh_at
+
+    api_token_refresh_at = (state.get("api_token_refresh_at") or 0) - offset
+    if self._valid(state.get("api_token"), api_token_refresh_at):
+      self.api_token = state["api_token"]
+      self.api_token_refresh_at = api_token_refresh_at
+      self.headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Authorization": f"Bearer {self.api_token}",
+      }
+
+  async def ensure_valid(self):
+    """Return True once a usable API token is available."""
+    if self._valid(self.api_token, self.api_token_refresh_at):
+      return True
+
+    return await self.refresh()
+
+  async def refresh(self, stale_token:str=None):
+    """Renew the tokens, unless another caller already replaced stale_token."""
+    if self._lock is None:
+      self._lock = asyncio.Lock()
+
+    async with self._lock:
+      if self.api_token != stale_token and self._valid(self.api_token, self.api_token_refresh_at):
+        return True
+
+      if not self._valid(self.access_token, self.access_token_refresh_at):
+        await self.get_access_token()
+
+        if not self.access_token:
+          raise ConnectionError("Authorization Error")
+
+      try:
+        await self.get_api_token()
+      except GoogleWifiAuthError:
+        await self.get_access_token()
+        await self.get_api_token()
+
+      if not self.api_token:
+        return False
+
+      self._schedule_refresh()
+      return True
+
+  def _schedule_refresh(self):
+    """Renew the tokens in the background when they are due."""
+    current = asyncio.current_task()
+    if self._refresh_task and self._refresh_task is not current:
+      self._refresh_task.cancel()
+
+    delay = max(0, self.api_token_refresh_at - time.monotonic())
+    self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_later(delay))
+
+  async def _refresh_later(self, delay:float):
+    """Sleep until the tokens are due and renew them."""
+    await asyncio.sleep(delay)
+
+    try:
+      await self.refresh(stale_token=self.api_token)
+    except (ConnectionError, ValueError, GoogleWifiException, aiohttp.ClientError, asyncio.TimeoutError):
+      # The next call through ensure_valid() retries and surfaces the error.
+      self.api_token = None
+
+  def close(self):
+    """Cancel the background refresh."""
+    if self._refresh_task:
+      self._refresh_task.cancel()
+      self._refresh_task = None
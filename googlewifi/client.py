@@ -0,0 +1,1093 @@
+"""The GoogleWifi REST client."""
+import asyncio
+import functools
+import hashlib
+import logging
+import random
+import time
+
+import aiohttp
+
+from .auth import TokenManager
+from .const import (
+  DNS_CACHE_TTL,
+  FOYER_PARAMS,
+  FOYER_URL,
+  IDEMPOTENT_METHODS,
+  ISSUE_TOKEN_URL,
+  KEEPALIVE_TIMEOUT,
+  LOCAL_URL,
+  MAX_RETRY_AFTER,
+  MAX_THROTTLE,
+  METRICS_STREAM_INTERVAL,
+  OAUTH_URL,
+  RETRY_STATUSES,
+  REVALIDATE_DELAY,
+  REVALIDATE_MAX_DELAY,
+  SPEED_TEST_HISTORY,
+  STATE_SAVE_INTERVAL,
+  SYSTEM_PAYLOAD_KEYS,
+  THROTTLE_DECAY,
+)
+from .exceptions import (
+  UPDATE_ERRORS,
+  GoogleHomeIgnoreDevice,
+  GoogleWifiAuthError,
+  GoogleWifiException,
+  GoogleWifiHTTPError,
+  GoogleWifiRateLimited,
+)
+from .foyer import FoyerMixin
+from .helpers import (
+  _blocking_policies,
+  _json_dumps,
+  _json_loads,
+  _memoized,
+  _merge_traffic,
+  _params_key,
+  _retry_after,
+  _stale_tag,
+  diff_systems,
+)
+from .limits import SingleFlight, TokenBucket
+from .local import LocalMixin
+from .metrics import RequestMetrics
+from .models import System, Systems
+from .operations import OperationPoller, OperationsMixin
+from .pauses import PauseSchedule
+from .speedtests import SpeedTestHistory
+from .state import StateStore
+from .traffic import MetricsStream, TrafficHistory
+
+_LOGGER = logging.getLogger(__name__)
+
+class GoogleWifi(OperationsMixin, FoyerMixin, LocalMixin):
+
+  foyer_url = FOYER_URL
+  oauth_url = OAUTH_URL
+  issue_token_url = ISSUE_TOKEN_URL
+  local_url = LOCAL_URL
+
+  def __init__(
+    self,
+    refresh_token,
+    session:aiohttp.ClientSession = None,
+    max_concurrency:int = 4,
+    sensitive_info_ttl:int = 86400,
+    operation_timeout:float = 300,
+    local_token_ttl:float = 86400,
+    request_timeout:float = 30,
+    retries:int = 2,
+    retry_backoff:float = 0.5,
+    connection_limit:int = 100,
+    connection_limit_per_host:int = 10,
+    metrics:bool = False,
+    metrics_callback = None,
+    traffic_history:bool = False,
+    history_capacity:dict = None,
+    limiter = None,
+    rate_limits:dict = None,
+    state_path:str = None,
+    speed_test_history:int = SPEED_TEST_HISTORY,
+    coalesce:bool = True,
+    coalesce_window:float = 0,
+    ):
+    """Get the API Bearer Token."""
+
+    self._session = session
+    self._own_session = session is None
+    self._session_factory = None
+    self._connection_limit = connection_limit
+    self._connection_limit_per_host = connection_limit_per_host
+    self._timeout = aiohttp.ClientTimeout(total=request_timeout)
+    self._retries = retries
+    self._retry_backoff = retry_backoff
+    self._limiter = limiter
+    self._buckets = {
+      endpoint_class: limit if isinstance(limit, TokenBucket) else TokenBucket(*limit)
+      for endpoint_class, limit in (rate_limits or {}).items()
+    }
+    self._throttle = 1.0
+    self._single_flight = SingleFlight(coalesce_window) if coalesce else None
+    self._metrics = RequestMetrics(metrics_callback) if metrics or metrics_callback else None
+
+    self._refresh_token = refresh_token
+    self._tokens = TokenManager(self)
+    self._systems = None
+    self._reported_systems = None
+    self._models = None
+    self._access_points = {}
+    self._pause_schedule = PauseSchedule(self._pause_expired)
+    self._pause_listeners = []
+    self._max_concurrency = max(1, max_concurrency)
+    self._sensitive_info_ttl = sensitive_info_ttl
+    self._station_macs = {}
+    self._fingerprints = {}
+    self._structured = {}
+    self._last_good = {}
+    self._system_errors = {}
+    self._revalidations = {}
+    self._metric_streams = {}
+    self._traffic_history = TrafficHistory(history_capacity) if traffic_history else None
+    self._speed_tests = SpeedTestHistory(speed_test_history)
+    self._state_store = StateStore(state_path) if state_path else None
+    self._snapshot_at = None
+    self._snapshot_live = False
+    self._warm_refresh = None
+    self._state_saver = None
+    self._state_dirty = False
+
+    if self._state_store is not None:
+      self._restore_state(self._state_store.load())
+    self._operation_poller = OperationPoller(
+      self.check_operation, timeout=operation_timeout, metrics=self._metrics
+    )
+    self._grpc_channel = None
+    self._grpc_stub = None
+    self._local_tokens = {}
+    self._local_tokens_lock = None
+    self._local_tokens_fetched_at = 0
+    self._invalidated_local_tokens = set()
+    self._local_token_ttl = local_token_ttl
+    self._local_info = {}
+    self._local_backoff = {}
+
+  async def close(self):
+    """Stop background work and close the session if it was created here."""
+    self._operation_poller.close()
+    self._tokens.close()
+
+    if self._single_flight is not None:
+      self._single_flight.close()
+
+    if self._warm_refresh is not None:
+      self._warm_refresh.cancel()
+      self._warm_refresh = None
+
+    if self._state_saver is not None:
+      self._state_saver.cancel()
+      self._state_saver = None
+      if self._state_dirty:
+        await self._save_state_logged()
+    self._pause_schedule.close()
+    self._local_tokens.clear()
+    self._local_tokens_fetched_at = 0
+
+    for task in self._revalidations.values():
+      task.cancel()
+    self._revalidations.clear()
+    self._local_info.clear()
+    self._local_backoff.clear()
+
+    for stream in self._metric_streams.values():
+      stream.close()
+    self._metric_streams.clear()
+
+    if self._grpc_channel is not None:
+      await self._grpc_channel.close()
+      self._grpc_channel = None
+      self._grpc_stub = None
+
+    if self._own_session and self._session:
+      await self._session.close()
+      self._session = None
+
+  @property
+  def metrics(self):
+    """Return the RequestMetrics of this client, or None if metrics are disabled."""
+    return self._metrics
+
+  def metrics_text(self):
+    """Return a Prometheus text snapshot of the metrics, empty if disabled."""
+    if self._metrics is None:
+      return ""
+
+    return self._metrics.prometheus()
+
+  def _client_session(self):
+    """Return the aiohttp session, creating a pooled one on first use."""
+    if self._session is None and self._session_factory is not None:
+      self._session = self._session_factory()
+
+    if self._session is None:
+      connector = aiohttp.TCPConnector(
+        limit=self._connection_limit,
+        limit_per_host=self._connection_limit_per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        ssl=False,
+      )
+      self._session = aiohttp.ClientSession(connector=connector)
+
+    return self._session
+
+  async def _request(
+    self,
+    method:str,
+    url:str,
+    headers:dict=None,
+    data=None,
+    json_payload=None,
+    params=None,
+    retries:int=None,
+    fingerprint=None,
+    timeout:float=None,
+    on_response=None,
+    ):
+    """Send a request, retrying idempotent calls, and return the decoded JSON.
+
+    With a fingerprint key, a body that is byte-identical to the previous one
+    for that key is not decoded again: the previous object is returned as is.
+    A timeout in seconds replaces the client's request_timeout for this call.
+
+    Identical concurrent Foyer GET calls (same URL, params and headers, so
+    the same token) share one request and its decoded result, which is kept
+    for coalesce_window seconds after. So on_response(payload) is called once
+    per request sent, not once per caller. Local Google Home calls are never
+    shared, since their polling reads must see the device's latest state.
+    """
+    async def send():
+      payload = await self._send_request(
+        method, url, headers, data, json_payload, params, retries, fingerprint, timeout
+      )
+      if on_response is not None:
+        on_response(payload)
+      return payload
+
+    if (
+      self._single_flight is None
+      or method != "GET"
+      or data is not None
+      or json_payload is not None
+      or not url.startswith(self.foyer_url)
+    ):
+      return await send()
+
+    key = (url, _params_key(params), _params_key(headers))
+    if self._metrics is not None and self._single_flight.shares(key):
+      self._metrics.observe_coalesced(self._metrics.endpoint(method, url))
+
+    return await self._single_flight.run(key, send)
+
+  async def _send_request(
+    self,
+    method:str,
+    url:str,
+    headers:dict,
+    data,
+    json_payload,
+    params,
+    retries:int,
+    fingerprint,
+    timeout:float,
+    ):
+    """Send one request, retrying idempotent calls, and return the decoded JSON."""
+    if json_payload is not None:
+      data = _json_dumps(json_payload)
+
+    throttled_retries = self._retries if retries is None else retries
+    if retries is None:
+      retries = self._retries if method in IDEMPOTENT_METHODS else 0
+
+    timeout = self._timeout if timeout is None else aiohttp.ClientTimeout(total=timeout)
+    bucket = self._buckets.get(self._endpoint_class(method, url)) if self._buckets else None
+
+    metrics = self._metrics
+    if metrics is not None:
+      endpoint = metrics.endpoint(method, url)
+      started = time.perf_counter()
+
+    attempt = 0
+    while True:
+      if bucket is not None:
+        await bucket.acquire()
+
+      try:
+        if self._limiter is None:
+          status, retry_after, body = await self._send(method, url, headers, data, params, timeout)
+        else:
+          async with self._limiter:
+            status, retry_after, body = await self._send(method, url, headers, data, params, timeout)
+      except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        if attempt >= retries:
+          if metrics is not None:
+            metrics.observe_error(endpoint, type(error).__name__)
+          if isinstance(error, asyncio.TimeoutError):
+            raise GoogleHomeIgnoreDevice(error)
+          raise ConnectionError(error)
+
+        if metrics is not None:
+          metrics.observe_retry(endpoint)
+
+        await asyncio.sleep(self._retry_delay(attempt))
+        attempt += 1
+        continue
+
+      if status != 429 and status not in RETRY_STATUSES:
+        break
+
+      self._throttle = min(MAX_THROTTLE, self._throttle * 2)
+      delay = max(self._retry_delay(attempt), _retry_after(retry_after))
+
+      if attempt >= (throttled_retries if status == 429 else retries) or delay > MAX_RETRY_AFTER:
+        if metrics is not None:
+          metrics.observe_error(endpoint, f"http_{status}")
+        if status == 429:
+          raise GoogleWifiRateLimited(status, f"{method} {url} was rate limited", delay)
+        raise GoogleWifiHTTPError(status, f"{method} {url} returned {status}")
+
+      if metrics is not None:
+        metrics.observe_retry(endpoint)
+
+      if bucket is not None:
+        bucket.pause(delay)
+
+      await asyncio.sleep(delay)
+      attempt += 1
+
+    if status == 401:
+      if metrics is not None:
+        metrics.observe_error(endpoint, "unauthorized")
+      raise GoogleWifiAuthError(f"Authorization rejected for {url}")
+
+    if status >= 400:
+      if metrics is not None:
+        metrics.observe_error(endpoint, f"http_{status}")
+      raise GoogleWifiHTTPError(
+        status, f"{method} {url} returned {status}: {body[:200].decode(errors='replace')}"
+      )
+
+    if self._throttle > 1:
+      self._throttle = max(1.0, self._throttle * THROTTLE_DECAY)
+
+    if metrics is not None:
+      metrics.observe_request(endpoint, time.perf_counter() - started, len(body))
+
+    if not body:
+      return {}
+
+    if fingerprint is not None:
+      digest = hashlib.blake2b(body, digest_size=16).digest()
+      previous = self._fingerprints.get(fingerprint)
+      if previous is not None and previous[0] == digest:
+        if metrics is not None:
+          metrics.observe_unchanged(endpoint)
+        return previous[1]
+
+    if metrics is None:
+      payload = _json_loads(body)
+    else:
+      started = time.perf_counter()
+      try:
+        payload = _json_loads(body)
+      finally:
+        metrics.observe_decode(endpoint, time.perf_counter() - started)
+
+    if fingerprint is not None:
+      self._fingerprints[fingerprint] = (digest, payload)
+
+    return payload
+
+  async def _send(self, method:str, url:str, headers:dict, data, params, timeout):
+    """Make one HTTP request and return its status, Retry-After header and body."""
+    async with self._client_session().request(
+      method,
+      url,
+      headers=headers,
+      data=data,
+      params=params,
+      ssl=False,
+      timeout=timeout,
+    ) as resp:
+      return resp.status, resp.headers.get("Retry-After"), await resp.read()
+
+  def _endpoint_class(self, method:str, url:str):
+    """Return the rate limit class of a request: auth, read, write or None for local calls."""
+    if url in (self.oauth_url, self.issue_token_url):
+      return "auth"
+
+    if not url.startswith(self.foyer_url):
+      return None
+
+    return "read" if method == "GET" else "write"
+
+  @property
+  def throttle_factor(self):
+    """Return how much polling should slow down, 1 when the API is not throttling."""
+    return self._throttle
+
+  def _retry_delay(self, attempt:int):
+    """Return an exponential back-off delay with full jitter."""
+    return random.uniform(0, self._retry_backoff * 2 ** attempt)
+
+  async def post_api(
+    self, 
+    url:str, 
+    headers:str=None, 
+    payload:str=None, 
+    params:str=None,
+    json_payload=None,
+    ):
+    """Post to the Google APIs."""
+    return await self._request(
+      "POST", url, headers=headers, data=payload, params=params, json_payload=json_payload
+    )
+
+  async def get_api(self, url:str, headers:str=None, payload:str=None, params:str=None):
+    """Get call to Google APIs."""
+    return await self._request("GET", url, headers=headers, data=payload or None, params=params)
+
+  async def put_api(self, url:str, headers:str=None, payload:str=None, params:str=None):
+    """Put call to Google APIs."""
+    return await self._request("PUT", url, headers=headers, data=payload or None, params=params)
+
+  async def delete_api(self, url:str, headers:str=None, payload:str=None, params:str=None):
+    """Delete call to Google APIs."""
+    return await self._request("DELETE", url, headers=headers, data=payload or None, params=params)
+
+  async def get_access_token(self):
+    """Get Access Token"""
+    await self._tokens.get_access_token()
+
+  async def get_api_token(self):
+    """Get the API Token."""
+    return await self._tokens.refresh(stale_token=self._tokens.api_token)
+
+  async def connect(self):
+    """Authenticate to the Google Wifi services."""
+    if await self._tokens.ensure_valid():
+      return True
+    else:
+      return False
+
+  async def _authorized(self, method:str, url:str, **kwargs):
+    """Call a Google API with the current token, renewing it once on a 401."""
+    token = self._tokens.api_token
+
+    try:
+      return await self._request(method, url, headers=self._tokens.headers, **kwargs)
+    except GoogleWifiAuthError:
+      await self._tokens.refresh(stale_token=token)
+      return await self._request(method, url, headers=self._tokens.headers, **kwargs)
+
+  async def get_groups(self):
+    """Retrieve the raw groups payload for this account."""
+    if await self.connect():
+      url = f"{self.foyer_url}/groups"
+
+      return await self._authorized("GET", url, params=FOYER_PARAMS, fingerprint=("groups", None))
+
+  async def get_systems(self):
+    """Get the systems on this account."""
+    response = await self.get_groups()
+
+    if response is not None:
+      if response.get("groups"):
+        self._systems = await self.structure_systems(response)
+        self._snapshot_at = time.time()
+        self._snapshot_live = True
+
+        if self._state_store is not None:
+          self._schedule_state_save()
+
+        return self._systems
+      else:
+        raise GoogleWifiException("Failed to retreive Google Wifi Data.")
+
+  @property
+  def cached_systems(self):
+    """Return the last get_systems() result, possibly loaded from state_path, or None."""
+    return self._systems
+
+  @property
+  def snapshot_age(self):
+    """Return the age in seconds of cached_systems, or None."""
+    if self._snapshot_at is None:
+      return None
+
+    return max(0.0, time.time() - self._snapshot_at)
+
+  async def get_cached_systems(self):
+    """Return the cached systems at once, refreshing them in the background if they came from disk.
+
+    Without cached systems this waits for get_systems().
+    """
+    if self._systems is None:
+      return await self.get_systems()
+
+    if not self._snapshot_live and (self._warm_refresh is None or self._warm_refresh.done()):
+      self._warm_refresh = asyncio.get_running_loop().create_task(self._refresh_warm_state())
+
+    return self._systems
+
+  async def _refresh_warm_state(self):
+    """Replace a snapshot loaded from disk with live data."""
+    try:
+      await self.get_systems()
+    except UPDATE_ERRORS:
+      # The next get_cached_systems() call tries again.
+      pass
+
+  async def save_state(self):
+    """Write the latest snapshot, station MAC cache and token expiry to state_path."""
+    if self._state_store is None:
+      raise GoogleWifiException("No state_path was given.")
+
+    now = time.time()
+    offset = now - time.monotonic()
+    state = {
+      "account": self._account_key(),
+      "saved_at": now,
+      "snapshot_at": self._snapshot_at,
+      "systems": self._systems,
+      "station_macs": {
+        system_id: {
+          station_id: [mac_address, cached_at + offset]
+          for station_id, (mac_address, cached_at) in mac_cache.items()
+        }
+        for system_id, mac_cache in self._station_macs.items()
+      },
+      "tokens": self._tokens.snapshot(),
+    }
+
+    await asyncio.get_running_loop().run_in_executor(None, self._state_store.save, state)
+
+  def _schedule_state_save(self):
+    """Save the state now, or once STATE_SAVE_INTERVAL has passed since the last save."""
+    self._state_dirty = True
+
+    if self._state_saver is None or self._state_saver.done():
+      self._state_saver = asyncio.get_running_loop().create_task(self._save_state_debounced())
+
+  async def _save_state_debounced(self):
+    """Save the state until no refresh changed it during the last interval."""
+    while self._state_dirty:
+      await self._save_state_logged()
+      await asyncio.sleep(STATE_SAVE_INTERVAL)
+
+  async def _save_state_logged(self):
+    """Save the state, logging instead of raising when it cannot be written."""
+    self._state_dirty = False
+
+    try:
+      await self.save_state()
+    except (OSError, ValueError, TypeError) as error:
+      _LOGGER.warning("Could not save the state to %s: %s", self._state_store.path, error)
+
+  def _restore_state(self, state:dict):
+    """Load a state saved by save_state() for the same refresh token."""
+    if not state or state.get("account") != self._account_key():
+      return
+
+    offset = time.time() - time.monotonic()
+
+    self._systems = state.get("systems")
+    self._snapshot_at = state.get("snapshot_at")
+
+    if self._systems and self._snapshot_at:
+      self._last_good = {
+        system_id: {"system": (this_system, self._snapshot_at)}
+        for system_id, this_system in self._systems.items()
+      }
+
+    for system_id, mac_cache in (state.get("station_macs") or {}).items():
+      self._station_macs[system_id] = {
+        station_id: (mac_address, cached_at - offset)
+        for station_id, (mac_address, cached_at) in mac_cache.items()
+      }
+
+    self._tokens.restore(state.get("tokens") or {})
+
+  def _account_key(self):
+    """Return a digest identifying the refresh token without storing it."""
+    return hashlib.blake2b(str(self._refresh_token).encode(), digest_size=16).hexdigest()
+
+  async def get_systems_changes(self, include_traffic:bool=False):
+    """Refresh the systems and return only what changed since the last call.
+
+    The first call compares with the last get_systems() result.
+    """
+    previous = self._systems if self._reported_systems is None else self._reported_systems
+    systems = await self.get_systems()
+
+    if systems is None:
+      return None
+
+    self._reported_systems = systems
+    return diff_systems(previous, systems, include_traffic=include_traffic)
+
+  async def get_devices(self, system_id):
+    """Retrieve the devices list for a given system."""
+    
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/stations"
+
+      response = await self._authorized("GET", url, params=FOYER_PARAMS, fingerprint=("stations", system_id))
+
+      if self._traffic_history is not None and "stations" in response:
+        self._traffic_history.retain(
+          system_id, {this_device["id"] for this_device in response["stations"]}
+        )
+
+      return(response)
+
+  async def get_status(self, system_id):
+    """Retrieve the status payload for a system."""
+
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/status"
+
+      response = await self._authorized("GET", url, params=FOYER_PARAMS, fingerprint=("status", system_id))
+
+      return(response)
+
+  async def structure_systems(self, system_data):
+    """Structure the data with ids in dict.
+
+    Every system is refreshed on its own. A system that fails without any
+    last good data to fall back on is left out and its error is kept in
+    system_errors; only if every system fails is the first error raised.
+    """
+    async def structure_isolated(this_system):
+      try:
+        return await self.structure_system(this_system)
+      except GoogleWifiAuthError:
+        raise
+      except UPDATE_ERRORS as error:
+        return error
+
+    structured = await self._gather_systems(structure_isolated, system_data["groups"])
+
+    systems = {}
+    errors = {}
+    for this_group, this_system in zip(system_data["groups"], structured):
+      if isinstance(this_system, Exception):
+        errors[this_group["id"]] = this_system
+      else:
+        systems[this_system["id"]] = this_system
+
+    self._system_errors = errors
+
+    if errors and not systems:
+      raise next(iter(errors.values()))
+
+    return systems
+
+  @property
+  def system_errors(self):
+    """Return {system_id: exception} for the systems left out of the last get_systems()."""
+    return self._system_errors
+
+  async def _gather_systems(self, structure, groups:list):
+    """Run structure() for every group, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(self._max_concurrency)
+
+    async def structure_limited(this_system):
+      async with semaphore:
+        return await structure(this_system)
+
+    structured = await asyncio.gather(
+      *[structure_limited(this_system) for this_system in groups]
+    )
+
+    system_ids = {this_system["id"] for this_system in groups}
+    for system_id in list(self._station_macs):
+      if system_id not in system_ids:
+        del self._station_macs[system_id]
+
+    for system_id in list(self._structured):
+      if system_id not in system_ids:
+        del self._structured[system_id]
+
+    for system_id in list(self._last_good):
+      if system_id not in system_ids:
+        del self._last_good[system_id]
+
+    for system_id in list(self._revalidations):
+      if system_id not in system_ids:
+        self._revalidations.pop(system_id).cancel()
+
+    if self._traffic_history is not None:
+      self._traffic_history.retain_systems(system_ids)
+
+    self._speed_tests.retain_systems(system_ids)
+
+    for key in list(self._fingerprints):
+      if key[1] is not None and key[1] not in system_ids:
+        del self._fingerprints[key]
+
+    self._pause_schedule.retain(system_ids)
+
+    return structured
+
+  async def get_system_models(self):
+    """Get the systems on this account as System models, indexed by station id and MAC."""
+    response = await self.get_groups()
+
+    if response is not None:
+      if not response.get("groups"):
+        raise GoogleWifiException("Failed to retreive Google Wifi Data.")
+
+      async def build_model(this_system):
+        payloads = await self.fetch_system_payloads(this_system["id"])
+        started = time.perf_counter()
+        self._update_pauses(this_system)
+        model = System.from_payloads(
+          this_system, *payloads, macs=self._station_macs.get(this_system["id"])
+        )
+        if self._metrics is not None:
+          self._metrics.observe_structure(time.perf_counter() - started)
+        return model
+
+      self._models = Systems(await self._gather_systems(build_model, response["groups"]))
+      return self._models
+
+  def add_pause_listener(self, callback):
+    """Call callback(system_id, station_id) when a pause expires and return an unsubscribe function."""
+    self._pause_listeners.append(callback)
+
+    def unsubscribe():
+      if callback in self._pause_listeners:
+        self._pause_listeners.remove(callback)
+
+    return unsubscribe
+
+  def _pause_expired(self, system_id:str, station_id:str):
+    """Mark a station unpaused in the latest data when its pause expires.
+
+    The systems, system and devices dicts are replaced by updated copies, so
+    snapshots already handed out are left as they were.
+    """
+    self._structured.get(system_id, {}).pop("devices", None)
+
+    this_system = (self._systems or {}).get(system_id)
+    if this_system is not None and station_id in this_system.get("devices", {}):
+      devices = dict(this_system["devices"])
+      devices[station_id] = dict(devices[station_id], paused=False)
+      self._systems = dict(self._systems)
+      self._systems[system_id] = dict(this_system, devices=devices)
+
+    if self._models is not None and system_id in self._models:
+      station = self._models[system_id].stations.get(station_id)
+      if station is not None:
+        station.paused = False
+
+    for callback in list(self._pause_listeners):
+      callback(system_id, station_id)
+
+  async def structure_system(self, this_system):
+    """Retrieve and structure the status, metrics and devices of one system.
+
+    A payload that cannot be retrieved is replaced by the last good one, and a
+    system that cannot be built at all by its last good structure. Either way
+    the result carries a "stale" dict with the age and error of each stale
+    part, and the system is refreshed again in the background.
+    """
+    system_id = this_system["id"]
+    last_good = self._last_good.setdefault(system_id, {})
+
+    try:
+      payloads, stale = await self._fetch_payloads_or_last_good(system_id)
+
+      started = time.perf_counter()
+      try:
+        system = self.build_system(this_system, *payloads)
+      except (KeyError, TypeError, AttributeError) as error:
+        # Any other malformed part of the payloads fails this system only.
+        raise GoogleWifiException(error) from error
+      finally:
+        if self._metrics is not None:
+          self._metrics.observe_structure(time.perf_counter() - started)
+    except GoogleWifiAuthError:
+      raise
+    except UPDATE_ERRORS as error:
+      if "system" not in last_good:
+        raise
+
+      system, updated_at = last_good["system"]
+      payloads = ()
+      stale = {"system": _stale_tag(updated_at, error, time.time())}
+
+    now = time.time()
+    for resource, payload in zip(SYSTEM_PAYLOAD_KEYS, payloads):
+      if resource not in stale:
+        last_good[resource] = (payload, now)
+
+    if not stale:
+      last_good["system"] = (system, now)
+      return system
+
+    self._schedule_revalidation(this_system)
+    return dict(system, stale=stale)
+
+  def _schedule_revalidation(self, this_system):
+    """Refresh a stale system in the background unless that is already under way."""
+    task = self._revalidations.get(this_system["id"])
+
+    if task is None or task.done():
+      self._revalidations[this_system["id"]] = asyncio.get_running_loop().create_task(
+        self._revalidate(this_system)
+      )
+
+  async def _revalidate(self, this_system):
+    """Retry a stale system with a growing delay and publish it once it is fresh."""
+    system_id = this_system["id"]
+    delay = REVALIDATE_DELAY
+
+    while True:
+      await asyncio.sleep(delay * self._throttle)
+
+      if "stale" not in (self._systems or {}).get(system_id, {}):
+        # A get_systems() call refreshed it or the system is gone.
+        return
+
+      try:
+        system = await self.structure_system(this_system)
+      except UPDATE_ERRORS:
+        system = None
+
+      if system is not None and "stale" not in system and system_id in (self._systems or {}):
+        self._systems = dict(self._systems)
+        self._systems[system_id] = system
+        return
+
+      delay = min(REVALIDATE_MAX_DELAY, delay * 2)
+
+  async def fetch_system_payloads(self, system_id:str):
+    """Retrieve the status, metrics and stations of a system, with station MACs cached."""
+    return await asyncio.gather(
+      self.get_status(system_id),
+      self.get_realtime_metrics(system_id),
+      self._get_devices_with_macs(system_id),
+    )
+
+  async def _fetch_payloads_or_last_good(self, system_id:str):
+    """Retrieve the payloads of a system, replacing each failed one by its last good version.
+
+    Returns the payloads and a stale tag for every replaced payload. Raises
+    the error of a failed payload that has no last good version.
+    """
+    outcomes = await asyncio.gather(
+      self.get_status(system_id),
+      self.get_realtime_metrics(system_id),
+      self._get_devices_with_macs(system_id),
+      return_exceptions=True,
+    )
+    last_good = self._last_good.get(system_id, {})
+    now = time.time()
+    payloads = []
+    stale = {}
+
+    for resource, payload in zip(SYSTEM_PAYLOAD_KEYS, outcomes):
+      if payload is None:
+        payload = GoogleWifiException(f"No {resource} response for {system_id}")
+      elif not isinstance(payload, BaseException):
+        missing = [key for key in SYSTEM_PAYLOAD_KEYS[resource] if key not in payload]
+        if missing:
+          payload = GoogleWifiException(f"{resource} of {system_id} is missing {', '.join(missing)}")
+
+      if isinstance(payload, BaseException):
+        if isinstance(payload, GoogleWifiAuthError) or not isinstance(payload, UPDATE_ERRORS):
+          raise payload
+        if resource not in last_good:
+          raise payload
+
+        error = payload
+        payload, updated_at = last_good[resource]
+        stale[resource] = _stale_tag(updated_at, error, now)
+
+      payloads.append(payload)
+
+    return payloads, stale
+
+  async def _get_devices_with_macs(self, system_id:str):
+    """Retrieve the stations of a system and cache the MACs of new ones."""
+    devices_list = await self.get_devices(system_id)
+    try:
+      station_ids = [this_device["id"] for this_device in devices_list["stations"]]
+    except KeyError as error:
+      raise GoogleWifiException(error)
+    await self.update_station_macs(system_id, station_ids)
+    return devices_list
+
+  def build_system(self, this_system, system_status, system_metrics, devices_list):
+    """Merge the raw payloads of one system into the get_systems() structure.
+
+    The payloads are not modified. Parts built from the same payload objects
+    as the previous call, as returned for unchanged responses, are reused.
+    """
+    memo = self._structured.setdefault(this_system["id"], {})
+
+    try:
+      status = system_status["wanConnectionStatus"]
+      group_traffic = system_metrics.get("groupTraffic",None)
+    except KeyError as error:
+      raise GoogleWifiException(error)
+
+    access_points = _memoized(
+      memo, "access_points", (this_system, system_status),
+      lambda: self.build_access_points(this_system, system_status),
+    )
+    devices = _memoized(
+      memo, "devices", (this_system, devices_list),
+      lambda: self.build_devices(this_system, devices_list),
+    )
+    devices = _memoized(
+      memo, "traffic", (devices, system_metrics),
+      lambda: _merge_traffic(devices, system_metrics),
+    )
+
+    return dict(
+      this_system,
+      status=status,
+      groupTraffic=group_traffic,
+      access_points=access_points,
+      devices=devices,
+    )
+
+  def build_access_points(self, this_system, system_status):
+    """Structure the access points of a system with their state."""
+    this_status = {}
+    access_points = {}
+
+    try:
+      for this_ap in system_status["apStatuses"]:
+        this_status[this_ap["apId"]] = this_ap
+
+      for this_ap in this_system["accessPoints"]:
+        access_points[this_ap["id"]] = dict(this_ap, status=this_status[this_ap["id"]]["apState"])
+    except (KeyError, TypeError) as error:
+      raise GoogleWifiException(error)
+
+    return access_points
+
+  def build_devices(self, this_system, devices_list):
+    """Structure the devices of a system with their pause state and MAC address."""
+    self._update_pauses(this_system)
+
+    devices = {}
+
+    try:
+      for this_device in devices_list["stations"]:
+        devices[this_device["id"]] = dict(
+          this_device,
+          paused=self._pause_schedule.is_paused(this_system["id"], this_device["id"]),
+        )
+    except KeyError as error:
+      raise GoogleWifiException(error)
+
+    for station_id, (mac_address, cached_at) in self._station_macs.get(this_system["id"], {}).items():
+      if station_id in devices:
+        devices[station_id]["macAddress"] = mac_address
+
+    return devices
+
+  def _update_pauses(self, this_system):
+    """Index the station blocking policies of a group, raising GoogleWifiException if they are malformed."""
+    try:
+      self._pause_schedule.update(this_system["id"], _blocking_policies(this_system))
+    except (KeyError, AttributeError, TypeError) as error:
+      raise GoogleWifiException(error)
+
+  async def update_station_macs(self, system_id:str, station_ids:list):
+    """Retrieve the MAC addresses of stations that are not cached yet."""
+    mac_cache = self._station_macs.setdefault(system_id, {})
+    now = time.monotonic()
+    present = set(station_ids)
+    cached = len(mac_cache)
+
+    for station_id in list(mac_cache):
+      cached_at = mac_cache[station_id][1]
+      if station_id not in present or now - cached_at > self._sensitive_info_ttl:
+        del mac_cache[station_id]
+
+    new_station_ids = [station_id for station_id in station_ids if station_id not in mac_cache]
+
+    if new_station_ids or len(mac_cache) != cached:
+      self._structured.get(system_id, {}).pop("devices", None)
+
+    if new_station_ids:
+      sensitive_info = await self.get_sensitive_info(system_id=system_id, station_ids=new_station_ids)
+      try:
+        for this_station in sensitive_info:
+          if this_station["stationId"] in present:
+            mac_cache[this_station["stationId"]] = (this_station.get("macAddress",{}), now)
+      except (KeyError, TypeError, AttributeError) as error:
+        raise GoogleWifiException(error)
+
+    return mac_cache
+
+  def clear_station_cache(self, system_id:str=None):
+    """Forget cached station MAC addresses for one or all systems."""
+    if system_id:
+      self._station_macs.pop(system_id, None)
+      self._structured.pop(system_id, None)
+    else:
+      self._station_macs.clear()
+      self._structured.clear()
+
+  async def get_realtime_metrics(self, system_id:str):
+    """Return real-time metrics from the system."""
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/realtimeMetrics"
+
+      response = await self._authorized(
+        "GET", url, params=FOYER_PARAMS, fingerprint=("metrics", system_id),
+        on_response=functools.partial(self._record_traffic, system_id),
+      )
+
+      return response
+
+  def _record_traffic(self, system_id:str, response:dict):
+    """Add a realtime metrics payload to the traffic history, if it is enabled."""
+    if self._traffic_history is not None and response:
+      try:
+        self._traffic_history.record(system_id, response)
+      except (KeyError, TypeError, AttributeError) as error:
+        raise GoogleWifiException(error) from error
+
+  @property
+  def traffic_history(self):
+    """Return the TrafficHistory of this client, or None if it is disabled."""
+    return self._traffic_history
+
+  def get_traffic_history(
+    self,
+    system_id:str,
+    station_id:str=None,
+    start:float=None,
+    end:float=None,
+    resolution:str="raw",
+    ):
+    """Return the recorded traffic of a station, or of the group without a station_id."""
+    if self._traffic_history is None:
+      raise GoogleWifiException("Traffic history is not enabled.")
+
+    return self._traffic_history.query(system_id, station_id, start, end, resolution)
+
+  async def stream_metrics(self, system_id:str, interval:float=METRICS_STREAM_INTERVAL):
+    """Yield realtime traffic of a system with deltas and rates every interval seconds.
+
+    Every consumer of the same system and interval shares one polling task.
+    The iterator ends when the client is closed.
+    """
+    key = (system_id, interval)
+    stream = self._metric_streams.get(key)
+
+    if stream is None:
+      stream = self._metric_streams[key] = MetricsStream(self, system_id, interval)
+
+    queue = stream.subscribe()
+
+    try:
+      while True:
+        sample = await queue.get()
+        if sample is None:
+          return
+        if isinstance(sample, Exception):
+          raise sample
+        yield sample
+    finally:
+      if stream.unsubscribe(queue) and self._metric_streams.get(key) is stream:
+        del self._metric_streams[key]
+    
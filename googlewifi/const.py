@@ -0,0 +1,55 @@
+"""Endpoints, defaults and limits shared by the googlewifi modules."""
+import re
+
+GH_HEADERS = {"Content-Type": "application/json"}
+FOYER_URL = "https://googlehomefoyer-pa.googleapis.com/v2"
+OAUTH_URL = "https://www.googleapis.com/oauth2/v4/token"
+ISSUE_TOKEN_URL = "https://oauthaccountmanager.googleapis.com/v1/issuetoken"
+LOCAL_URL = "https://{host}:8443/setup"
+FOYER_PARAMS = (("prettyPrint", "false"),)
+FOYER_GRPC_HOST = "googlehomefoyer-pa.googleapis.com:443"
+LOCAL_TOKEN_MARGIN = 3600
+BLUETOOTH_SCAN_TIMEOUT = 5
+BLUETOOTH_POLL_INTERVAL = 1
+EUREKA_PARAMS = (
+  "version", "audio", "name", "build_info", "detail", "device_info", "net", "wifi", "setup",
+  "settings", "opt_in", "opencast", "multizone", "proxy", "night_mode_params", "user_eq",
+  "room_equalizer",
+)
+LOCAL_INFO_TIMEOUT = 5
+LOCAL_INFO_CONCURRENCY = 16
+LOCAL_BACKOFF_BASE = 30
+LOCAL_BACKOFF_MAX = 900
+IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE")
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RETRY_AFTER = 60
+MAX_THROTTLE = 16
+THROTTLE_DECAY = 0.9
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+POLL_SOURCES = ("groups", "status", "metrics", "stations")
+SYSTEM_PAYLOAD_KEYS = {
+  "status": ("wanConnectionStatus", "apStatuses"),
+  "metrics": (),
+  "stations": ("stations",),
+}
+REVALIDATE_DELAY = 5
+REVALIDATE_MAX_DELAY = 300
+STATE_SAVE_INTERVAL = 30
+RFC3339_PATTERN = re.compile(
+  r"^(\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2})(?:\.(\d+))?([Zz]|[+-]\d{2}:\d{2})$"
+)
+DEFAULT_INTERVALS = {"groups": 300, "status": 15, "metrics": 30, "stations": 120}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+ENDPOINT_ID_PATTERN = re.compile(r"(?<!/stations)/(groups|operations|accesspoints)/[^/]+")
+ENDPOINT_CACHE_SIZE = 4096
+METRICS_STREAM_INTERVAL = 5
+METRICS_STREAM_BUFFER = 16
+TRAFFIC_FIELDS = ("transmitSpeedBps", "receiveSpeedBps")
+HISTORY_RESOLUTIONS = {"raw": 0, "minute": 60, "hour": 3600}
+HISTORY_CAPACITY = {"raw": 720, "minute": 1440, "hour": 720}
+SPEED_TEST_FIELDS = ("downloadSpeedKbps", "uploadSpeedKbps")
+SPEED_TEST_HISTORY = 64
+OPERATION_DONE_STATES = ("DONE",)
+OPERATION_FAILED_STATES = ("FAILED", "ERROR", "CANCELLED", "ABORTED")
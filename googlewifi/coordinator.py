@@ -0,0 +1,209 @@
+"""Per-source polling coordinator for a GoogleWifi client."""
+import asyncio
+import logging
+import time
+
+from .client import GoogleWifi
+from .const import DEFAULT_INTERVALS, POLL_SOURCES
+from .exceptions import UPDATE_ERRORS, GoogleWifiAuthError, GoogleWifiException
+
+_LOGGER = logging.getLogger(__name__)
+
+class GoogleWifiCoordinator:
+  """Refresh each Google Wifi data source on its own interval."""
+
+  def __init__(self, client:GoogleWifi, intervals:dict=None):
+    """Set up the coordinator around a GoogleWifi client."""
+    self._client = client
+    self._intervals = dict(DEFAULT_INTERVALS)
+    self._intervals.update(intervals or {})
+    self._groups = {}
+    self._payloads = {}
+    self._listeners = []
+    self._tasks = []
+    self._notify_tasks = set()
+    self._unsubscribe_pause = None
+    self.data = {}
+    self.last_update = {}
+    self.last_error = {}
+    self.system_errors = {}
+
+  def subscribe(self, callback):
+    """Call callback(data, source) after every update and return an unsubscribe function."""
+    self._listeners.append(callback)
+
+    def unsubscribe():
+      if callback in self._listeners:
+        self._listeners.remove(callback)
+
+    return unsubscribe
+
+  async def start(self):
+    """Load every data source once and start the refresh tasks.
+
+    Systems the client loaded from its state_path are published first, with
+    source "cache", so listeners have data before the first live refresh ends.
+    """
+    if not self.data and self._client.cached_systems:
+      self.data = dict(self._client.cached_systems)
+      await self._notify("cache")
+
+    await self.refresh("groups")
+
+    self._unsubscribe_pause = self._client.add_pause_listener(self._pause_expired)
+
+    loop = asyncio.get_running_loop()
+    for source in POLL_SOURCES:
+      self._tasks.append(loop.create_task(self._poll(source, self._intervals[source])))
+
+  async def stop(self):
+    """Stop the refresh tasks."""
+    tasks = self._tasks + list(self._notify_tasks)
+    for task in tasks:
+      task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+    self._tasks = []
+    self._notify_tasks.clear()
+
+    if self._unsubscribe_pause:
+      self._unsubscribe_pause()
+      self._unsubscribe_pause = None
+
+  async def refresh(self, source:str, system_ids:list=None):
+    """Refresh one data source now and merge it into the data.
+
+    A system whose payload cannot be retrieved keeps its previous payload and
+    its error is kept in system_errors[system_id][source]. The first error is
+    raised only if every system fails.
+    """
+    if source == "groups":
+      updated = await self._refresh_groups()
+    else:
+      system_ids = list(self._groups) if system_ids is None else system_ids
+      results = await asyncio.gather(
+        *[self._fetch(source, system_id) for system_id in system_ids],
+        return_exceptions=True,
+      )
+      updated = []
+      errors = []
+      for system_id, payload in zip(system_ids, results):
+        if isinstance(payload, BaseException):
+          if isinstance(payload, GoogleWifiAuthError) or not isinstance(payload, UPDATE_ERRORS):
+            raise payload
+          self.system_errors.setdefault(system_id, {})[source] = payload
+          errors.append(payload)
+          continue
+
+        self.system_errors.get(system_id, {}).pop(source, None)
+        if system_id in self._groups:
+          self._payloads[system_id][source] = payload
+          updated.append(system_id)
+
+      if errors and len(errors) == len(system_ids):
+        raise errors[0]
+
+    for system_id in updated:
+      self._rebuild(system_id)
+
+    self.last_update[source] = time.monotonic()
+    self.last_error.pop(source, None)
+    await self._notify(source)
+
+  async def _refresh_groups(self):
+    """Refresh the group list and load the other sources for new systems."""
+    response = await self._client.get_groups()
+
+    if not response or not response.get("groups"):
+      raise GoogleWifiException("Failed to retreive Google Wifi Data.")
+
+    groups = {this_system["id"]: this_system for this_system in response["groups"]}
+
+    # data can also hold systems from the client's on-disk snapshot.
+    for system_id in set(self._groups) | set(self.data):
+      if system_id not in groups:
+        self._groups.pop(system_id, None)
+        self._payloads.pop(system_id, None)
+        self.data.pop(system_id, None)
+        self.system_errors.pop(system_id, None)
+
+    new_systems = [system_id for system_id in groups if system_id not in self._groups]
+    self._groups = groups
+
+    for system_id in new_systems:
+      self._payloads[system_id] = {}
+
+    if new_systems:
+      for source in POLL_SOURCES:
+        if source != "groups":
+          await self.refresh(source, new_systems)
+
+    return list(groups)
+
+  async def _fetch(self, source:str, system_id:str):
+    """Retrieve the payload of one data source for one system."""
+    if source == "status":
+      return await self._client.get_status(system_id)
+
+    if source == "metrics":
+      return await self._client.get_realtime_metrics(system_id)
+
+    devices_list = await self._client.get_devices(system_id)
+    station_ids = [this_device["id"] for this_device in devices_list.get("stations", [])]
+    await self._client.update_station_macs(system_id, station_ids)
+    return devices_list
+
+  def _rebuild(self, system_id:str):
+    """Rebuild one system from its latest payloads once all of them are loaded.
+
+    A system that cannot be built keeps its previous data and the error is
+    kept in system_errors[system_id]["build"].
+    """
+    payloads = self._payloads.get(system_id, {})
+    if not all(source in payloads for source in ("status", "metrics", "stations")):
+      return
+
+    try:
+      self.data[system_id] = self._client.build_system(
+        self._groups[system_id], payloads["status"], payloads["metrics"], payloads["stations"]
+      )
+    except (*UPDATE_ERRORS, KeyError, TypeError, AttributeError) as error:
+      self.system_errors.setdefault(system_id, {})["build"] = error
+    else:
+      self.system_errors.get(system_id, {}).pop("build", None)
+
+  def _pause_expired(self, system_id:str, station_id:str):
+    """Unpause a station in the data when its pause expires and notify listeners.
+
+    The system, devices and device dicts are replaced by updated copies, as
+    they can be shared with get_systems() results.
+    """
+    this_system = self.data.get(system_id)
+
+    if this_system is not None and station_id in this_system.get("devices", {}):
+      devices = dict(this_system["devices"])
+      devices[station_id] = dict(devices[station_id], paused=False)
+      self.data[system_id] = dict(this_system, devices=devices)
+      task = asyncio.get_running_loop().create_task(self._notify("pause"))
+      self._notify_tasks.add(task)
+      task.add_done_callback(self._notify_tasks.discard)
+
+  async def _notify(self, source:str):
+    """Call every listener with the current data, logging the errors they raise."""
+    for callback in list(self._listeners):
+      try:
+        result = callback(self.data, source)
+        if asyncio.iscoroutine(result):
+          await result
+      except Exception:
+        _LOGGER.exception("Error in a GoogleWifiCoordinator listener for %s", source)
+
+  async def _poll(self, source:str, interval:float):
+    """Refresh a data source forever on its interval."""
+    while True:
+      await asyncio.sleep(interval * self._client.throttle_factor)
+
+      try:
+        await self.refresh(source)
+      except UPDATE_ERRORS as error:
+        self.last_error[source] = error
@@ -0,0 +1,50 @@
+"""Exceptions raised by the googlewifi client."""
+
+class GoogleWifiException(Exception):
+  """Platform not ready exception."""
+  pass
+
+class GoogleWifiAuthError(GoogleWifiException):
+  """The Google API rejected the authorization token."""
+
+class GoogleWifiHTTPError(GoogleWifiException):
+  """The Google API answered with an error status."""
+
+  def __init__(self, status:int, message:str):
+    """Keep the HTTP status."""
+    super().__init__(message)
+    self.status = status
+
+class GoogleWifiRateLimited(GoogleWifiHTTPError):
+  """The Google API kept answering 429 Too Many Requests."""
+
+  def __init__(self, status:int, message:str, retry_after:float):
+    """Keep the seconds the API asked to wait."""
+    super().__init__(status, message)
+    self.retry_after = retry_after
+
+class GoogleHomeUpdateFailed(Exception):
+  """Google Home Update failed, token refresh required."""
+
+class GoogleHomeIgnoreDevice(Exception):
+  """Google Home can't get data, ignore it."""
+
+def __getattr__(name:str):
+  """Build UPDATE_ERRORS on first access, so catching the exceptions does not import aiohttp."""
+  if name != "UPDATE_ERRORS":
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+  import asyncio
+
+  import aiohttp
+
+  value = (
+    GoogleWifiException,
+    GoogleHomeIgnoreDevice,
+    ConnectionError,
+    ValueError,
+    asyncio.TimeoutError,
+    aiohttp.ClientError,
+  )
+  globals()[name] = value
+  return value
@@ -0,0 +1,108 @@
+"""Local Google Home tokens from the Foyer gRPC API.
+
+grpc and the ghome_foyer_api stubs are imported on first use, so clients that
+only call the REST API never load them.
+"""
+import asyncio
+import time
+
+from .const import FOYER_GRPC_HOST, LOCAL_TOKEN_MARGIN
+
+class FoyerMixin:
+  """Local Google Home tokens from the Foyer gRPC API."""
+
+  def _foyer_stub(self):
+    """Return the Foyer gRPC stub on a channel that is created once and reused."""
+    if self._grpc_channel is None:
+      import grpc.aio
+      from ghome_foyer_api.api_pb2_grpc import StructuresServiceStub
+
+      self._grpc_channel = grpc.aio.secure_channel(FOYER_GRPC_HOST, grpc.ssl_channel_credentials())
+      self._grpc_stub = StructuresServiceStub(self._grpc_channel)
+
+    return self._grpc_stub
+
+  async def _get_home_graph(self):
+    """Call GetHomeGraph with the current token, renewing it once if rejected."""
+    import grpc.aio
+    from ghome_foyer_api.api_pb2 import GetHomeGraphRequest
+
+    token = self._tokens.api_token
+
+    try:
+      return await self._foyer_stub().GetHomeGraph(
+        GetHomeGraphRequest(), metadata=(("authorization", f"Bearer {token}"),)
+      )
+    except grpc.aio.AioRpcError as error:
+      if error.code() != grpc.StatusCode.UNAUTHENTICATED:
+        raise
+
+    await self._tokens.refresh(stale_token=token)
+
+    return await self._foyer_stub().GetHomeGraph(
+      GetHomeGraphRequest(), metadata=(("authorization", f"Bearer {self._tokens.api_token}"),)
+    )
+
+  def _local_tokens_valid(self):
+    """Return True if the last GetHomeGraph result is fresh.
+
+    Devices that were not in it stay unknown until it expires.
+    """
+    if not self._local_tokens_fetched_at:
+      return False
+
+    refresh_before = time.monotonic() - self._local_token_ttl + LOCAL_TOKEN_MARGIN
+    return self._local_tokens_fetched_at > refresh_before
+
+  async def refresh_tokens(self, force:bool=False):
+    """Refresh the Google Access tokens for local Google devices."""
+    requested_at = time.monotonic()
+
+    if not force and self._local_tokens_valid():
+      return {device_id: token for device_id, (token, fetched_at) in self._local_tokens.items()}
+
+    if self._local_tokens_lock is None:
+      self._local_tokens_lock = asyncio.Lock()
+
+    async with self._local_tokens_lock:
+      # Another caller may have refreshed the tokens while this one waited.
+      if self._local_tokens_valid() and (not force or self._local_tokens_fetched_at >= requested_at):
+        return {device_id: token for device_id, (token, fetched_at) in self._local_tokens.items()}
+
+      if await self.connect():
+        resp = await self._get_home_graph()
+        data = resp.home.devices
+        fetched_at = time.monotonic()
+        self._local_tokens_fetched_at = fetched_at
+        self._invalidated_local_tokens.clear()
+
+        tokens = {}
+
+        for device in data:
+            # this is the 'cloud device id'
+            if device.local_auth_token != "":
+              tokens[
+                  device.device_info.project_info.string2
+              ] = device.local_auth_token
+
+        self._local_tokens = {
+          device_id: (token, fetched_at) for device_id, token in tokens.items()
+        }
+
+        return tokens
+
+  async def get_local_token(self, device_id:str):
+    """Return the cached local token of a Google Home, refreshing it when needed."""
+    tokens = await self.refresh_tokens(force=device_id in self._invalidated_local_tokens)
+
+    if tokens:
+      return tokens.get(device_id)
+
+  def invalidate_local_token(self, device_id:str=None):
+    """Drop a local token that was rejected so the next lookup refreshes it."""
+    if device_id is None:
+      self._local_tokens.clear()
+      self._local_tokens_fetched_at = 0
+    else:
+      self._local_tokens.pop(device_id, None)
+      self._invalidated_local_tokens.add(device_id)
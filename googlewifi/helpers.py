@@ -0,0 +1,215 @@
+"""JSON, timestamp and payload helpers shared by the client and models."""
+import datetime
+import email.utils
+import functools
+import json
+import time
+
+from .const import RFC3339_PATTERN
+from .exceptions import GoogleWifiException
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+def _json_loads(body:bytes):
+  """Decode a JSON response body, using orjson when it is installed."""
+  if orjson:
+    return orjson.loads(body)
+
+  return json.loads(body)
+
+def _json_dumps(payload):
+  """Encode a JSON request body, using orjson when it is installed."""
+  if orjson:
+    return orjson.dumps(payload)
+
+  return json.dumps(payload).encode()
+
+def _blocking_policies(this_system:dict):
+  """Return the station blocking policies of a group, by station id."""
+  blocking_policies = {}
+  if this_system["groupSettings"].get("familyHubSettings").get("stationPolicies"):
+    for blocking_policy in this_system["groupSettings"]["familyHubSettings"]["stationPolicies"]:
+      blocking_policies[blocking_policy["stationId"]] = blocking_policy
+
+  return blocking_policies
+
+@functools.lru_cache(maxsize=4096)
+def _parse_timestamp(value:str):
+  """Parse an RFC 3339 timestamp, falling back to dateutil for other formats."""
+  match = RFC3339_PATTERN.match(value)
+
+  if match:
+    base, fraction, offset = match.groups()
+    fraction = (fraction or "")[:6].ljust(6, "0")
+    offset = "+00:00" if offset in ("Z", "z") else offset
+    return datetime.datetime.fromisoformat(f"{base}.{fraction}{offset}")
+
+  import dateutil.parser
+
+  return dateutil.parser.parse(value)
+
+def _policy_expiry(blocking_policy:dict):
+  """Return the Unix expiry time of a blocking policy, 0 meaning indefinite."""
+  return _parse_timestamp(blocking_policy["blockingPolicy"]["expiryTimestamp"]).timestamp()
+
+def _policy_paused(blocking_policy:dict, now:float):
+  """Return True if a blocking policy pauses its station at the given Unix time."""
+  expiry = _policy_expiry(blocking_policy)
+
+  return expiry > now or expiry == 0
+
+def _memoized(memo:dict, name:str, inputs:tuple, build):
+  """Return what build() returned for the same input objects last time, or build it again."""
+  previous = memo.get(name)
+
+  if previous is not None and all(old is new for old, new in zip(previous[0], inputs)):
+    return previous[1]
+
+  value = build()
+  memo[name] = (inputs, value)
+  return value
+
+def _merge_traffic(devices:dict, system_metrics:dict):
+  """Return a copy of devices with the station traffic of a metrics payload."""
+  station_metrics = system_metrics.get("stationMetrics")
+
+  if not station_metrics:
+    return devices
+
+  merged = dict(devices)
+  try:
+    for this_station in station_metrics:
+      station_id = this_station["station"]["id"]
+      if station_id in merged:
+        merged[station_id] = dict(merged[station_id], traffic=this_station.get("traffic",{}))
+  except (KeyError, TypeError, AttributeError) as error:
+    raise GoogleWifiException(error)
+
+  return merged
+
+def _retry_after(value:str):
+  """Return the seconds to wait from a Retry-After header, or 0."""
+  if not value:
+    return 0
+
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+
+  try:
+    retry_at = email.utils.parsedate_to_datetime(value)
+  except (TypeError, ValueError):
+    return 0
+
+  if retry_at.tzinfo is None:
+    retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+
+  return max(0.0, retry_at.timestamp() - time.time())
+
+def _collect_outcomes(targets:list, outcomes:list):
+  """Split gathered outcomes into {"results": {}, "errors": {}} by target."""
+  results = {}
+  errors = {}
+
+  for target, outcome in zip(targets, outcomes):
+    if isinstance(outcome, Exception):
+      errors[target] = outcome
+    else:
+      results[target] = outcome
+
+  return {"results": results, "errors": errors}
+
+def _params_key(params):
+  """Return a hashable form of request params or headers given as a dict, pairs or None."""
+  if not params:
+    return ()
+
+  if isinstance(params, dict):
+    return tuple(sorted(params.items()))
+
+  return tuple(params)
+
+def _stale_tag(updated_at:float, error:Exception, now:float):
+  """Describe data last refreshed at updated_at that could not be refreshed because of error."""
+  return {
+    "updated_at": updated_at,
+    "age": max(0.0, now - updated_at),
+    "error": f"{type(error).__name__}: {error}",
+  }
+
+def _changed(old:dict, new:dict, ignore:tuple):
+  """Return True if two dicts differ outside of the ignored keys."""
+  return any(
+    old.get(key) != new.get(key)
+    for key in old.keys() | new.keys()
+    if key not in ignore
+  )
+
+def diff_systems(previous:dict, current:dict, include_traffic:bool=False):
+  """Return the change sets between two get_systems() results."""
+  previous = previous or {}
+  ignore = () if include_traffic else ("traffic", "groupTraffic")
+
+  changes = {
+    "systems_added": [system_id for system_id in current if system_id not in previous],
+    "systems_removed": [system_id for system_id in previous if system_id not in current],
+    "systems": {},
+  }
+
+  for system_id, this_system in current.items():
+    old_system = previous.get(system_id, {})
+    system_changes = {}
+
+    if old_system.get("status") != this_system.get("status"):
+      system_changes["wan_status"] = (old_system.get("status"), this_system.get("status"))
+
+    if bool(old_system.get("stale")) != bool(this_system.get("stale")):
+      system_changes["stale"] = this_system.get("stale")
+
+    old_aps = old_system.get("access_points", {})
+    new_aps = this_system.get("access_points", {})
+    ap_changes = {}
+    for ap_id in old_aps.keys() | new_aps.keys():
+      old_state = old_aps.get(ap_id, {}).get("status")
+      new_state = new_aps.get(ap_id, {}).get("status")
+      if old_state != new_state:
+        ap_changes[ap_id] = (old_state, new_state)
+    if ap_changes:
+      system_changes["access_points"] = ap_changes
+
+    old_devices = old_system.get("devices", {})
+    new_devices = this_system.get("devices", {})
+    added = {}
+    changed = {}
+    paused = {}
+    for device_id, this_device in new_devices.items():
+      old_device = old_devices.get(device_id)
+      if old_device is None:
+        added[device_id] = this_device
+        continue
+
+      if _changed(old_device, this_device, ignore):
+        changed[device_id] = this_device
+
+      if old_device.get("paused") != this_device.get("paused"):
+        paused[device_id] = this_device.get("paused")
+
+    removed = [device_id for device_id in old_devices if device_id not in new_devices]
+
+    if added:
+      system_changes["devices_added"] = added
+    if removed:
+      system_changes["devices_removed"] = removed
+    if changed:
+      system_changes["devices_changed"] = changed
+    if paused:
+      system_changes["paused"] = paused
+
+    if system_changes:
+      changes["systems"][system_id] = system_changes
+
+  return changes
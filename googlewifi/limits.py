@@ -0,0 +1,199 @@
+"""Request rate and concurrency limiters and request coalescing."""
+import asyncio
+import collections
+import time
+
+class TokenBucket:
+  """Allow rate requests per second on average, in bursts of up to burst."""
+
+  def __init__(self, rate:float, burst:int = 1):
+    """Start with a full bucket."""
+    self.rate = rate
+    self.burst = max(1, burst)
+    self.tokens = float(self.burst)
+    self._updated = time.monotonic()
+
+  async def acquire(self):
+    """Take a token, waiting in turn until one is available."""
+    self._refill()
+    self.tokens -= 1
+
+    if self.tokens < 0:
+      try:
+        await asyncio.sleep(-self.tokens / self.rate)
+      except asyncio.CancelledError:
+        self.tokens += 1
+        raise
+
+  def pause(self, seconds:float):
+    """Hold back every request for seconds, as asked by a Retry-After."""
+    self._refill()
+    self.tokens = min(self.tokens, -seconds * self.rate)
+
+  def _refill(self):
+    """Add the tokens earned since the last update."""
+    now = time.monotonic()
+    self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+class FairLimiter:
+  """Share request slots between accounts, serving waiting accounts in turn."""
+
+  def __init__(self, limit:int, account_limit:int = None):
+    """Allow limit slots in total and account_limit per account."""
+    self.limit = max(1, limit)
+    self.account_limit = max(1, account_limit or limit)
+    self.active = 0
+    self._active = collections.Counter()
+    self._waiters = collections.OrderedDict()
+
+  @property
+  def waiting(self):
+    """Return the number of queued acquisitions."""
+    return sum(len(waiters) for waiters in self._waiters.values())
+
+  def account(self, key):
+    """Return an async context manager that takes a slot for key."""
+    return _LimiterSlot(self, key)
+
+  async def acquire(self, key):
+    """Wait for a slot for key."""
+    if key not in self._waiters and self._available(key):
+      self._take(key)
+      return
+
+    future = asyncio.get_running_loop().create_future()
+    self._waiters.setdefault(key, collections.deque()).append(future)
+
+    try:
+      await future
+    except asyncio.CancelledError:
+      if future.done() and not future.cancelled():
+        self.release(key)
+      else:
+        self._discard(key, future)
+      raise
+
+  def release(self, key):
+    """Return a slot of key and hand free slots to waiting accounts."""
+    self.active -= 1
+    self._active[key] -= 1
+    if not self._active[key]:
+      del self._active[key]
+
+    self._wake()
+
+  def _available(self, key):
+    """Return True if key may take a slot now."""
+    return self.active < self.limit and self._active[key] < self.account_limit
+
+  def _take(self, key):
+    """Count a slot as taken by key."""
+    self.active += 1
+    self._active[key] += 1
+
+  def _discard(self, key, future):
+    """Forget a cancelled waiter."""
+    waiters = self._waiters.get(key)
+    if waiters is not None and future in waiters:
+      waiters.remove(future)
+      if not waiters:
+        del self._waiters[key]
+
+  def _wake(self):
+    """Give free slots to the first waiting accounts, then move them to the back."""
+    while self.active < self.limit:
+      for key, waiters in self._waiters.items():
+        if self._available(key):
+          break
+      else:
+        return
+
+      future = waiters.popleft()
+      if waiters:
+        self._waiters.move_to_end(key)
+      else:
+        del self._waiters[key]
+
+      if not future.done():
+        self._take(key)
+        future.set_result(None)
+
+class SingleFlight:
+  """Run identical concurrent calls once and share the result, also for window seconds after."""
+
+  def __init__(self, window:float = 0):
+    """Start without calls in flight."""
+    self.window = window
+    self._calls = {}
+    self._results = {}
+
+  def shares(self, key):
+    """Return True if a call for key would be served by another call or a fresh result."""
+    if key in self._calls:
+      return True
+
+    cached = self._results.get(key)
+    return cached is not None and cached[0] > time.monotonic()
+
+  async def run(self, key, call):
+    """Return the result of call(), or of an identical call in flight or finished within window."""
+    cached = self._results.get(key)
+    if cached is not None:
+      if cached[0] > time.monotonic():
+        return cached[1]
+      del self._results[key]
+
+    entry = self._calls.get(key)
+    if entry is None:
+      entry = self._calls[key] = {"task": asyncio.get_running_loop().create_task(call()), "waiters": 0}
+      entry["task"].add_done_callback(lambda task: self._finish(key, entry))
+
+    entry["waiters"] += 1
+    try:
+      return await asyncio.shield(entry["task"])
+    except asyncio.CancelledError:
+      entry["waiters"] -= 1
+      # The call goes on as long as someone still waits for it.
+      if entry["waiters"] == 0 and not entry["task"].done():
+        entry["task"].cancel()
+      raise
+
+  def close(self):
+    """Cancel the calls in flight and forget the kept results."""
+    for entry in self._calls.values():
+      entry["task"].cancel()
+
+    self._calls.clear()
+    self._results.clear()
+
+  def _finish(self, key, entry):
+    """Stop sharing a finished call and keep its result for window seconds."""
+    if self._calls.get(key) is entry:
+      del self._calls[key]
+
+    task = entry["task"]
+    if task.cancelled() or task.exception() is not None or not self.window:
+      return
+
+    now = time.monotonic()
+    for expired in [cached_key for cached_key, (expires, result) in self._results.items() if expires <= now]:
+      del self._results[expired]
+
+    self._results[key] = (now + self.window, task.result())
+
+class _LimiterSlot:
+  """One account's view of a FairLimiter."""
+
+  __slots__ = ("_limiter", "_key")
+
+  def __init__(self, limiter:FairLimiter, key):
+    """Bind the limiter to an account key."""
+    self._limiter = limiter
+    self._key = key
+
+  async def __aenter__(self):
+    await self._limiter.acquire(self._key)
+
+  async def __aexit__(self, *exc_info):
+    self._limiter.release(self._key)
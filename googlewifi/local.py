@@ -0,0 +1,191 @@
+"""Calls to Google Home speakers on the local network."""
+import asyncio
+import time
+
+from .const import (
+  BLUETOOTH_POLL_INTERVAL,
+  BLUETOOTH_SCAN_TIMEOUT,
+  EUREKA_PARAMS,
+  GH_HEADERS,
+  LOCAL_BACKOFF_BASE,
+  LOCAL_BACKOFF_MAX,
+  LOCAL_INFO_CONCURRENCY,
+  LOCAL_INFO_TIMEOUT,
+)
+from .exceptions import GoogleHomeIgnoreDevice, GoogleHomeUpdateFailed
+from .helpers import _collect_outcomes
+
+class LocalMixin:
+  """Calls to Google Home speakers on the local network."""
+
+  async def update_info(self, host, params=None, ttl:float=0, timeout:float=None):
+    """Update data from Google Home.
+
+    params selects the eureka_info fields (a list or a comma separated string,
+    all of them by default). A response for the same host and fields that is
+    younger than ttl seconds is returned from the cache.
+    """
+    fields = _eureka_fields(params)
+    cached = self._local_info.get((host, fields))
+
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+      return cached[1]
+
+    self._check_local_backoff(host)
+
+    url = f"{self.local_url.format(host=host)}/eureka_info"
+    params = {
+      "params":",".join(fields),
+      "options":"detail"
+    }
+
+    try:
+      response = await self._request("GET", url, params=params, retries=0, timeout=timeout)
+    except GoogleHomeIgnoreDevice:
+      self._back_off_local(host)
+      raise
+
+    self._local_backoff.pop(host, None)
+
+    if response:
+      self._local_info[(host, fields)] = (time.monotonic(), response)
+      return response
+    else:
+      raise GoogleHomeUpdateFailed()
+
+  async def collect_info(
+    self,
+    hosts,
+    params=None,
+    ttl:float=0,
+    timeout:float=LOCAL_INFO_TIMEOUT,
+    max_concurrency:int=LOCAL_INFO_CONCURRENCY,
+    ):
+    """Run update_info() on many Google Homes at once, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def collect(host):
+      async with semaphore:
+        return await self.update_info(host, params=params, ttl=ttl, timeout=timeout)
+
+    outcomes = await asyncio.gather(*[collect(host) for host in hosts], return_exceptions=True)
+
+    return _collect_outcomes(hosts, outcomes)
+
+  def reset_local_backoff(self, host:str=None):
+    """Let a backed off Google Home (or all of them) be queried again right away."""
+    if host is None:
+      self._local_backoff.clear()
+    else:
+      self._local_backoff.pop(host, None)
+
+  def _check_local_backoff(self, host:str):
+    """Raise GoogleHomeIgnoreDevice while a host is backed off."""
+    failures, retry_at = self._local_backoff.get(host, (0, 0))
+    remaining = retry_at - time.monotonic()
+
+    if remaining > 0:
+      raise GoogleHomeIgnoreDevice(
+        f"{host} failed {failures} times in a row, retrying in {remaining:.0f} s"
+      )
+
+  def _back_off_local(self, host:str):
+    """Double the time a failing host is skipped, up to LOCAL_BACKOFF_MAX."""
+    failures = self._local_backoff.get(host, (0, 0))[0] + 1
+    delay = min(LOCAL_BACKOFF_MAX, LOCAL_BACKOFF_BASE * 2 ** (failures - 1))
+    self._local_backoff[host] = (failures, time.monotonic() + delay)
+
+  async def get_bluetooth_status(self, host, token):
+    """Retrieve the current bluetooth status."""
+    if await self.connect():
+      url = f"{self.local_url.format(host=host)}/bluetooth/status"
+      headers = {"cast-local-authorization-token": token}
+
+      response = await self._request("GET", url, headers=headers, retries=0)
+
+      return response
+
+  async def get_bluetooth_devices(self, host, token):
+    """Retrieve the current bluetooth clients from a Google Home."""
+
+    if await self.connect():
+      return await self._scan_speaker(host, token, BLUETOOTH_SCAN_TIMEOUT, BLUETOOTH_POLL_INTERVAL)
+
+  async def scan_bluetooth(
+    self,
+    speakers,
+    timeout:float = BLUETOOTH_SCAN_TIMEOUT,
+    poll_interval:float = BLUETOOTH_POLL_INTERVAL,
+    ):
+    """Scan from many Google Homes at once and merge the results by MAC address."""
+    if isinstance(speakers, dict):
+      speakers = list(speakers.items())
+
+    results = await asyncio.gather(
+      *[self._scan_speaker(host, token, timeout, poll_interval) for host, token in speakers],
+      return_exceptions=True,
+    )
+
+    devices = {}
+    errors = {}
+
+    for (host, token), scan_results in zip(speakers, results):
+      if isinstance(scan_results, Exception):
+        errors[host] = scan_results
+        continue
+
+      for this_device in scan_results or []:
+        mac_address = this_device.get("mac_address")
+        rssi = this_device.get("rssi")
+        if not mac_address:
+          continue
+
+        entry = devices.get(mac_address)
+        if entry is None:
+          entry = devices[mac_address] = dict(this_device, host=host, rssi_by_host={})
+
+        if rssi is None:
+          continue
+
+        if host not in entry["rssi_by_host"] or rssi > entry["rssi_by_host"][host]:
+          entry["rssi_by_host"][host] = rssi
+
+        if entry.get("rssi") is None or rssi > entry["rssi"]:
+          entry.update(this_device, host=host)
+
+    return {"devices": devices, "errors": errors}
+
+  async def _scan_speaker(self, host:str, token:str, timeout:float, poll_interval:float):
+    """Run one bluetooth scan on a Google Home and return its results."""
+    headers = dict(GH_HEADERS)
+    headers["Host"] = host
+    headers["cast-local-authorization-token"] = token
+
+    url = f"{self.local_url.format(host=host)}/bluetooth/scan"
+    data = {"enable": True, "clear_results": True, "timeout": timeout}
+
+    await self._request("POST", url, headers=headers, json_payload=data, retries=0)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout + poll_interval
+    url = f"{self.local_url.format(host=host)}/bluetooth/status"
+
+    while loop.time() < deadline:
+      await asyncio.sleep(min(poll_interval, max(0, deadline - loop.time())))
+      status = await self._request("GET", url, headers=headers, retries=0)
+
+      if status.get("scanning_enabled") is False:
+        break
+
+    url = f"{self.local_url.format(host=host)}/bluetooth/scan_results"
+
+    return await self._request("GET", url, headers=headers, retries=0)
+
+def _eureka_fields(params):
+  """Return the eureka_info fields to request as a sorted tuple, all of them by default."""
+  if params is None:
+    params = EUREKA_PARAMS
+  elif isinstance(params, str):
+    params = params.split(",")
+
+  return tuple(sorted({field.strip() for field in params if field.strip()}))
@@ -0,0 +1,172 @@
+"""Request metrics and their Prometheus exposition."""
+import bisect
+import collections
+import itertools
+import urllib.parse
+
+from .const import ENDPOINT_CACHE_SIZE, ENDPOINT_ID_PATTERN, LATENCY_BUCKETS, POLL_BUCKETS
+
+class Histogram:
+  """Cumulative histogram with fixed bucket bounds."""
+
+  __slots__ = ("bounds", "counts", "sum", "count")
+
+  def __init__(self, bounds:tuple):
+    """Set up empty buckets."""
+    self.bounds = bounds
+    self.counts = [0] * len(bounds)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value:float):
+    """Add a value."""
+    index = bisect.bisect_left(self.bounds, value)
+    if index < len(self.counts):
+      self.counts[index] += 1
+    self.sum += value
+    self.count += 1
+
+  def cumulative(self):
+    """Return (bound, cumulative count) pairs."""
+    return list(zip(self.bounds, itertools.accumulate(self.counts)))
+
+class RequestMetrics:
+  """Per-endpoint request, retry, error and timing statistics."""
+
+  def __init__(self, callback=None):
+    """Set up empty metrics with an optional callback(name, labels, value)."""
+    self._callback = callback
+    self._endpoints = {}
+    self.requests = collections.Counter()
+    self.retries = collections.Counter()
+    self.errors = collections.Counter()
+    self.response_bytes = collections.Counter()
+    self.unchanged = collections.Counter()
+    self.coalesced = collections.Counter()
+    self.latency = {}
+    self.decode = {}
+    self.operation_polls = Histogram(POLL_BUCKETS)
+    self.structure = Histogram(LATENCY_BUCKETS)
+
+  def endpoint(self, method:str, url:str):
+    """Return the endpoint label of a request, with ids replaced by placeholders."""
+    key = (method, url)
+    label = self._endpoints.get(key)
+
+    if label is None:
+      path = ENDPOINT_ID_PATTERN.sub(r"/\1/{id}", urllib.parse.urlsplit(url).path)
+      label = f"{method} {path}"
+      if len(self._endpoints) < ENDPOINT_CACHE_SIZE:
+        self._endpoints[key] = label
+
+    return label
+
+  def observe_request(self, endpoint:str, seconds:float, size:int):
+    """Record a completed request."""
+    self.requests[endpoint] += 1
+    self.response_bytes[endpoint] += size
+    self._histogram(self.latency, endpoint).observe(seconds)
+    self._emit("request_duration_seconds", {"endpoint": endpoint}, seconds)
+
+  def observe_decode(self, endpoint:str, seconds:float):
+    """Record the time spent decoding a response."""
+    self._histogram(self.decode, endpoint).observe(seconds)
+    self._emit("json_decode_seconds", {"endpoint": endpoint}, seconds)
+
+  def observe_unchanged(self, endpoint:str):
+    """Record a response that was identical to the previous one and not decoded."""
+    self.unchanged[endpoint] += 1
+    self._emit("unchanged_responses_total", {"endpoint": endpoint}, 1)
+
+  def observe_coalesced(self, endpoint:str):
+    """Record a read served by an identical request in flight or just finished."""
+    self.coalesced[endpoint] += 1
+    self._emit("coalesced_requests_total", {"endpoint": endpoint}, 1)
+
+  def observe_retry(self, endpoint:str):
+    """Record a retried request."""
+    self.retries[endpoint] += 1
+    self._emit("request_retries_total", {"endpoint": endpoint}, 1)
+
+  def observe_error(self, endpoint:str, error:str):
+    """Record a failed request."""
+    self.errors[(endpoint, error)] += 1
+    self._emit("request_errors_total", {"endpoint": endpoint, "error": error}, 1)
+
+  def observe_polls(self, polls:int, outcome:str):
+    """Record how many checks an operation took."""
+    self.operation_polls.observe(polls)
+    self._emit("operation_polls", {"outcome": outcome}, polls)
+
+  def observe_structure(self, seconds:float):
+    """Record the time spent structuring one system."""
+    self.structure.observe(seconds)
+    self._emit("structure_seconds", {}, seconds)
+
+  def prometheus(self):
+    """Return the metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def counter(name, help_text, values):
+      lines.append(f"# HELP googlewifi_{name} {help_text}")
+      lines.append(f"# TYPE googlewifi_{name} counter")
+      for labels, value in values:
+        lines.append(f"googlewifi_{name}{_labels(labels)} {value}")
+
+    def histogram(name, help_text, histograms):
+      lines.append(f"# HELP googlewifi_{name} {help_text}")
+      lines.append(f"# TYPE googlewifi_{name} histogram")
+      for labels, this_histogram in histograms:
+        for bound, count in this_histogram.cumulative():
+          lines.append(f"googlewifi_{name}_bucket{_labels(dict(labels, le=repr(float(bound))))} {count}")
+        lines.append(f"googlewifi_{name}_bucket{_labels(dict(labels, le='+Inf'))} {this_histogram.count}")
+        lines.append(f"googlewifi_{name}_sum{_labels(labels)} {this_histogram.sum}")
+        lines.append(f"googlewifi_{name}_count{_labels(labels)} {this_histogram.count}")
+
+    counter("requests_total", "Completed requests.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.requests.items())])
+    counter("request_retries_total", "Retried requests.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.retries.items())])
+    counter("request_errors_total", "Failed requests.",
+      [({"endpoint": endpoint, "error": error}, value) for (endpoint, error), value in sorted(self.errors.items())])
+    counter("response_bytes_total", "Response body bytes.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.response_bytes.items())])
+    counter("unchanged_responses_total", "Responses identical to the previous one, not decoded again.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.unchanged.items())])
+    counter("coalesced_requests_total", "Reads served by an identical request in flight or just finished.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.coalesced.items())])
+    histogram("request_duration_seconds", "Request latency.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.latency.items())])
+    histogram("json_decode_seconds", "Response decoding time.",
+      [({"endpoint": endpoint}, value) for endpoint, value in sorted(self.decode.items())])
+    histogram("operation_polls", "Status checks per long-running operation.",
+      [({}, self.operation_polls)])
+    histogram("structure_seconds", "Time spent structuring one system.",
+      [({}, self.structure)])
+
+    return "\n".join(lines) + "\n"
+
+  def _histogram(self, histograms:dict, endpoint:str):
+    """Return the latency histogram of an endpoint."""
+    this_histogram = histograms.get(endpoint)
+    if this_histogram is None:
+      this_histogram = histograms[endpoint] = Histogram(LATENCY_BUCKETS)
+    return this_histogram
+
+  def _emit(self, name:str, labels:dict, value:float):
+    """Pass an observation to the callback."""
+    if self._callback is not None:
+      self._callback(name, labels, value)
+
+def _labels(labels:dict):
+  """Format Prometheus labels."""
+  if not labels:
+    return ""
+
+  return "{" + ",".join(
+    f'{key}="{_label_value(value)}"' for key, value in labels.items()
+  ) + "}"
+
+def _label_value(value):
+  """Escape a Prometheus label value."""
+  return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,240 @@
+"""Slotted models of systems, access points, stations and traffic."""
+import time
+from collections.abc import Mapping
+
+from .exceptions import GoogleWifiException
+from .helpers import _blocking_policies, _policy_paused
+
+class TrafficSample:
+  """Transmit and receive speeds from a realtime metrics payload."""
+
+  __slots__ = ("raw",)
+
+  def __init__(self, raw:dict):
+    """Wrap a raw traffic payload."""
+    self.raw = raw
+
+  @property
+  def transmit_bps(self):
+    """Return the transmit speed in bits per second."""
+    return int(self.raw.get("transmitSpeedBps", 0))
+
+  @property
+  def receive_bps(self):
+    """Return the receive speed in bits per second."""
+    return int(self.raw.get("receiveSpeedBps", 0))
+
+  def as_dict(self):
+    """Return the raw traffic payload."""
+    return self.raw
+
+class Station:
+  """A device connected to a Google Wifi system."""
+
+  __slots__ = ("raw", "system_id", "paused", "mac_address", "_traffic")
+
+  def __init__(self, raw:dict, system_id:str, paused:bool=False, mac_address:str=None, traffic:dict=None):
+    """Wrap a raw station payload."""
+    self.raw = raw
+    self.system_id = system_id
+    self.paused = paused
+    self.mac_address = mac_address
+    self._traffic = traffic
+
+  @property
+  def id(self):
+    """Return the station id."""
+    return self.raw["id"]
+
+  @property
+  def name(self):
+    """Return the friendly name of the station."""
+    return self.raw.get("friendlyName")
+
+  @property
+  def connected(self):
+    """Return True if the station is connected."""
+    return self.raw.get("connected", False)
+
+  @property
+  def ip_addresses(self):
+    """Return the IP addresses of the station."""
+    return self.raw.get("ipAddresses", [])
+
+  @property
+  def traffic(self):
+    """Return the latest traffic sample of the station, if any."""
+    if self._traffic is None:
+      return None
+
+    return TrafficSample(self._traffic)
+
+  def get(self, key:str, default=None):
+    """Return any other field from the raw station payload."""
+    return self.raw.get(key, default)
+
+  def as_dict(self):
+    """Return the station in the get_systems() dict format."""
+    device = dict(self.raw, paused=self.paused)
+
+    if self.mac_address is not None:
+      device["macAddress"] = self.mac_address
+
+    if self._traffic is not None:
+      device["traffic"] = self._traffic
+
+    return device
+
+class AccessPoint:
+  """An access point of a Google Wifi system."""
+
+  __slots__ = ("raw", "system_id", "state")
+
+  def __init__(self, raw:dict, system_id:str, state:str=None):
+    """Wrap a raw access point payload."""
+    self.raw = raw
+    self.system_id = system_id
+    self.state = state
+
+  @property
+  def id(self):
+    """Return the access point id."""
+    return self.raw["id"]
+
+  def get(self, key:str, default=None):
+    """Return any other field from the raw access point payload."""
+    return self.raw.get(key, default)
+
+  def as_dict(self):
+    """Return the access point in the get_systems() dict format."""
+    return dict(self.raw, status=self.state)
+
+class System:
+  """A Google Wifi system with its access points and stations."""
+
+  __slots__ = ("raw", "status", "access_points", "stations", "_traffic", "_by_mac")
+
+  def __init__(self, raw:dict, status:str, access_points:dict, stations:dict, traffic:dict=None):
+    """Set up a system from already structured parts."""
+    self.raw = raw
+    self.status = status
+    self.access_points = access_points
+    self.stations = stations
+    self._traffic = traffic
+    self._by_mac = None
+
+  @classmethod
+  def from_payloads(cls, this_system, system_status, system_metrics, devices_list, macs:dict=None):
+    """Build a system from its raw payloads without modifying them."""
+    system_id = this_system["id"]
+    macs = macs or {}
+
+    try:
+      ap_states = {this_ap["apId"]: this_ap["apState"] for this_ap in system_status["apStatuses"]}
+      access_points = {
+        this_ap["id"]: AccessPoint(this_ap, system_id, ap_states[this_ap["id"]])
+        for this_ap in this_system["accessPoints"]
+      }
+
+      traffic = {}
+      for this_station in system_metrics.get("stationMetrics") or []:
+        traffic[this_station["station"]["id"]] = this_station.get("traffic",{})
+
+      policies = _blocking_policies(this_system)
+      now = time.time()
+      stations = {}
+      for this_device in devices_list["stations"]:
+        station_id = this_device["id"]
+        mac_address = macs.get(station_id)
+        stations[station_id] = Station(
+          this_device,
+          system_id,
+          paused=station_id in policies and _policy_paused(policies[station_id], now),
+          mac_address=mac_address[0] if mac_address else None,
+          traffic=traffic.get(station_id),
+        )
+
+      return cls(
+        this_system,
+        system_status["wanConnectionStatus"],
+        access_points,
+        stations,
+        system_metrics.get("groupTraffic",None),
+      )
+    except (KeyError, AttributeError, TypeError) as error:
+      raise GoogleWifiException(error)
+
+  @property
+  def id(self):
+    """Return the system id."""
+    return self.raw["id"]
+
+  @property
+  def traffic(self):
+    """Return the latest traffic sample of the whole system, if any."""
+    if self._traffic is None:
+      return None
+
+    return TrafficSample(self._traffic)
+
+  def station_by_mac(self, mac_address:str):
+    """Return the station with a MAC address, or None."""
+    if self._by_mac is None:
+      self._by_mac = {
+        station.mac_address: station
+        for station in self.stations.values() if station.mac_address
+      }
+
+    return self._by_mac.get(mac_address)
+
+  def get(self, key:str, default=None):
+    """Return any other field from the raw group payload."""
+    return self.raw.get(key, default)
+
+  def as_dict(self):
+    """Return the system in the get_systems() dict format."""
+    return dict(
+      self.raw,
+      status=self.status,
+      groupTraffic=self._traffic,
+      access_points={ap_id: this_ap.as_dict() for ap_id, this_ap in self.access_points.items()},
+      devices={station_id: station.as_dict() for station_id, station in self.stations.items()},
+    )
+
+class Systems(Mapping):
+  """The systems of an account, indexed by system id, station id and MAC address."""
+
+  __slots__ = ("_systems", "_stations", "_by_mac")
+
+  def __init__(self, systems):
+    """Index a list of System models."""
+    self._systems = {this_system.id: this_system for this_system in systems}
+    self._stations = {}
+    self._by_mac = {}
+
+    for this_system in self._systems.values():
+      for station in this_system.stations.values():
+        self._stations[station.id] = station
+        if station.mac_address:
+          self._by_mac[station.mac_address] = station
+
+  def __getitem__(self, system_id:str):
+    return self._systems[system_id]
+
+  def __iter__(self):
+    return iter(self._systems)
+
+  def __len__(self):
+    return len(self._systems)
+
+  def station(self, station_id:str):
+    """Return the station with an id, or None."""
+    return self._stations.get(station_id)
+
+  def station_by_mac(self, mac_address:str):
+    """Return the station with a MAC address, or None."""
+    return self._by_mac.get(mac_address)
+
+  def as_dict(self):
+    """Return all systems in the get_systems() dict format."""
+    return {system_id: this_system.as_dict() for system_id, this_system in self._systems.items()}
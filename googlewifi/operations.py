@@ -0,0 +1,481 @@
+"""Long-running Foyer operations and their shared poller."""
+import asyncio
+import datetime
+
+from .const import FOYER_PARAMS, OPERATION_DONE_STATES, OPERATION_FAILED_STATES
+from .exceptions import GoogleWifiException
+from .helpers import _collect_outcomes
+
+class OperationsMixin:
+  """Long-running operations: pauses, prioritization, lighting, restarts, speed tests and sensitive info."""
+
+  async def _start_operation(self, method:str, url:str, json_payload=None):
+    """Call an endpoint that starts an operation and return the operation payload."""
+    response = await self._authorized(method, url, json_payload=json_payload, params=FOYER_PARAMS)
+    operation = response.get("operation")
+
+    if not operation:
+      raise GoogleWifiException(f"No operation returned: {response}")
+
+    return operation
+
+  async def _pause_operation(self, system_id:str, device_id:str, pause_state:bool):
+    """Start a pause or unpause operation."""
+    url = f"{self.foyer_url}/groups/{system_id}/stationBlocking"
+
+    payload = {
+      "blocked": str(pause_state).lower(),
+      "stationId": device_id
+    }
+
+    return await self._start_operation("PUT", url, json_payload=payload)
+
+  async def _brightness_operation(self, ap_id:str, brightness:int):
+    """Start an access point brightness operation."""
+    brightness = 0 if brightness < 0 else brightness
+    brightness = 100 if brightness > 100 else brightness
+
+    url = f"{self.foyer_url}/accesspoints/{ap_id}/lighting"
+
+    payload = {
+      "automatic": False,
+      "intensity": brightness
+    }
+
+    return await self._start_operation("PUT", url, json_payload=payload)
+
+  async def _restart_ap_operation(self, ap_id:str):
+    """Start an access point restart operation."""
+    url = f"{self.foyer_url}/accesspoints/{ap_id}/reboot"
+
+    return await self._start_operation("POST", url)
+
+  async def _run_operations(self, targets:list, start, wait:bool, max_concurrency:int=None):
+    """Start an operation per target under a semaphore and collect results and errors."""
+    semaphore = asyncio.Semaphore(max_concurrency or self._max_concurrency)
+
+    async def run(target):
+      async with semaphore:
+        operation = await start(target)
+
+      if wait:
+        operation = await self.wait_for_operation(operation["operationId"])
+
+      return operation
+
+    outcomes = await asyncio.gather(*[run(target) for target in targets], return_exceptions=True)
+
+    return _collect_outcomes(targets, outcomes)
+
+  async def pause_device(self, system_id:str, device_id:str, pause_state:bool):
+    """Pause or unpause a specific device"""
+
+    if await self.connect():
+      operation = await self._pause_operation(system_id, device_id, pause_state)
+
+      return operation.get("operationState") == "CREATED"
+
+    else:
+      return False
+
+  async def pause_devices(
+    self,
+    system_id:str,
+    device_ids:list,
+    pause_state:bool,
+    wait:bool=False,
+    max_concurrency:int=None,
+    ):
+    """Pause or unpause many devices of a system at once."""
+    if await self.connect():
+      return await self._run_operations(
+        list(device_ids),
+        lambda device_id: self._pause_operation(system_id, device_id, pause_state),
+        wait,
+        max_concurrency,
+      )
+
+  async def prioritize_device(self, system_id:str, device_id:str, duration_hours:int=1):
+    """Set priority device for specified time (default 1 hour)."""
+    
+    if await self.connect():
+      duration_hours = 1 if duration_hours < 1 else duration_hours
+      duration_hours = 6 if duration_hours > 6 else duration_hours
+      
+      url = f"{self.foyer_url}/groups/{system_id}/prioritizedStation"
+
+      end_time = datetime.datetime.now() + datetime.timedelta(hours=duration_hours)
+
+      end_time = end_time.astimezone().replace(microsecond=0).isoformat()
+
+      payload = {
+        "stationId": device_id,
+        "prioritizationEndTime": end_time
+      }
+
+      operation = await self._start_operation("PUT", url, json_payload=payload)
+
+      return operation.get("operationState") == "CREATED"
+
+    else:
+      return False
+
+  async def clear_prioritization(self, system_id:str):
+    """Clear any device prioritization."""
+    
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/prioritizedStation"
+
+      operation = await self._start_operation("DELETE", url)
+
+      return operation.get("operationState") == "CREATED"
+
+    else:
+      return False
+
+  async def set_brightness(self, ap_id:str, brightness:int):
+    """Set Access Point Light Brightness."""
+
+    if await self.connect():
+      operation = await self._brightness_operation(ap_id, brightness)
+
+      return operation.get("operationState") == "CREATED"
+
+    else:
+      return False
+
+  async def set_brightness_many(
+    self,
+    ap_ids:list,
+    brightness:int,
+    wait:bool=False,
+    max_concurrency:int=None,
+    ):
+    """Set the light brightness of many Access Points at once."""
+    if await self.connect():
+      return await self._run_operations(
+        list(ap_ids),
+        lambda ap_id: self._brightness_operation(ap_id, brightness),
+        wait,
+        max_concurrency,
+      )
+
+  async def restart_ap(self, ap_id:str):
+    """Restart a specific Access Point."""
+
+    if await self.connect():
+      operation = await self._restart_ap_operation(ap_id)
+
+      return operation.get("operationState") == "CREATED"
+    
+    else:
+      return False
+
+  async def restart_aps(self, ap_ids:list, wait:bool=False, max_concurrency:int=None):
+    """Restart many Access Points at once."""
+    if await self.connect():
+      return await self._run_operations(
+        list(ap_ids), self._restart_ap_operation, wait, max_concurrency
+      )
+
+  async def restart_system(self, system_id:str):
+    """Restart the whole Google Wifi System."""
+
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/reboot"
+
+      operation = await self._start_operation("POST", url)
+
+      return operation.get("operationState") == "CREATED"
+
+    else:
+      return False
+
+  async def create_wan_speedtest(self, system_id:str):
+    """Start a speed test operation on a system."""
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/wanSpeedTest"
+
+      response = await self._authorized("POST", url, params=FOYER_PARAMS)
+      operation_id = response["operation"]["operationId"]
+
+      return operation_id
+
+  async def check_operation(self, operation_id: str):
+    """Check the status of a speed test operation."""
+    if await self.connect():
+      url = f"{self.foyer_url}/operations/{operation_id}"
+
+      return await self._authorized("GET", url, params=FOYER_PARAMS)
+
+  async def wait_for_operation(self, operation_id:str, timeout:float=None):
+    """Wait for a long-running operation to finish and return its final status."""
+    return await self._operation_poller.wait(operation_id, timeout=timeout)
+
+  async def speed_test_results(self, system_id:str, max_results:int=1):
+    """Retrieve the latest max_results speed test results and add them to the history."""
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/speedTestResults"
+      params = (
+        ('prettyPrint', 'false'),
+        ('maxResultCount', max_results)
+      )
+
+      response = await self._authorized("GET", url, params=params)
+
+      try:
+        results = response["speedTestResults"]
+      except KeyError as error:
+        raise GoogleWifiException(error)
+
+      self._speed_tests.record(system_id, results)
+
+      return results
+
+  async def run_speed_test(self, system_id:str, max_results:int=1):
+    """Run a speed test and return the results."""
+    if await self.connect():
+      operation_id = await self.create_wan_speedtest(system_id=system_id)
+
+      await self.wait_for_operation(operation_id)
+
+      results = await self.speed_test_results(system_id=system_id, max_results=max_results)
+      return results[0]
+
+  async def run_speed_tests(
+    self,
+    system_ids:list,
+    max_concurrency:int=1,
+    stagger:float=0,
+    max_results:int=1,
+    ):
+    """Run speed tests on many systems and return the latest result of each.
+
+    At most max_concurrency tests run at once and tests start at least stagger
+    seconds apart, so tests on a shared uplink do not overlap.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    gate = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    next_start = loop.time()
+
+    async def run(system_id):
+      nonlocal next_start
+
+      async with semaphore:
+        async with gate:
+          await asyncio.sleep(max(0, next_start - loop.time()))
+          next_start = loop.time() + stagger
+
+        return await self.run_speed_test(system_id, max_results=max_results)
+
+    outcomes = await asyncio.gather(*[run(system_id) for system_id in system_ids], return_exceptions=True)
+
+    return _collect_outcomes(system_ids, outcomes)
+
+  async def fetch_speed_test_history(self, system_ids:list, max_results:int=10, max_concurrency:int=None):
+    """Fetch the last max_results speed test results of many systems into the history."""
+    semaphore = asyncio.Semaphore(max_concurrency or self._max_concurrency)
+
+    async def fetch(system_id):
+      async with semaphore:
+        return await self.speed_test_results(system_id, max_results=max_results)
+
+    outcomes = await asyncio.gather(*[fetch(system_id) for system_id in system_ids], return_exceptions=True)
+
+    return _collect_outcomes(system_ids, outcomes)
+
+  def get_speed_test_history(self, system_id:str, start:float=None, end:float=None):
+    """Return the recorded speed test results of a system between start and end, or None."""
+    return self._speed_tests.query(system_id, start, end)
+
+  def speed_test_summary(self, system_id:str, start:float=None, end:float=None):
+    """Return the count and mean, min and max speeds of a system between start and end."""
+    return self._speed_tests.summary(system_id, start, end)
+
+  async def start_retrieve_sensitive_info(self, system_id:str, station_ids:list):
+    """Start the request to return the device sensitive information."""
+    if await self.connect():
+      url = f"{self.foyer_url}/groups/{system_id}/stations/operations/sensitiveInfo"
+      json_payload = {"stationIds":station_ids}
+      response = await self._authorized("POST", url, json_payload=json_payload, params=FOYER_PARAMS)
+      operation_id = response.get("operation",[]).get("operationId")
+
+      return operation_id
+
+  async def sensitive_info_results(self, operation_id:str):
+    """Return the results of the sensitive info request."""
+    if await self.connect():
+      url = f"{self.foyer_url}/operations/{operation_id}/sensitiveInfo"
+
+      return await self._authorized("GET", url, params=FOYER_PARAMS)
+
+  async def get_sensitive_info(self, system_id:str, station_ids:list):
+    """Return a full set of sensitive info on the system."""
+    if await self.connect():
+      operation_id = await self.start_retrieve_sensitive_info(
+        system_id=system_id,station_ids=station_ids
+      )
+
+      await self.wait_for_operation(operation_id)
+
+      results = await self.sensitive_info_results(operation_id=operation_id)
+      return results.get("stationSensitiveInfos",[])
+
+class OperationPoller:
+  """Poll any number of long-running operations from a single task."""
+
+  def __init__(
+    self,
+    check_operation,
+    initial_interval:float = 1,
+    max_interval:float = 10,
+    backoff:float = 1.5,
+    timeout:float = 300,
+    metrics = None,
+    ):
+    """Set up the poller around a check_operation coroutine."""
+    self._check_operation = check_operation
+    self._initial_interval = initial_interval
+    self._max_interval = max_interval
+    self._backoff = backoff
+    self._timeout = timeout
+    self._metrics = metrics
+    self._operations = {}
+    self._task = None
+    self._wakeup = None
+
+  @property
+  def pending(self):
+    """Return the ids of the operations still being polled."""
+    return list(self._operations)
+
+  async def wait(self, operation_id:str, timeout:float=None):
+    """Wait for an operation to finish and return its final status."""
+    loop = asyncio.get_running_loop()
+    entry = self._operations.get(operation_id)
+
+    if entry is None:
+      timeout = self._timeout if timeout is None else timeout
+      entry = {
+        "future": loop.create_future(),
+        "interval": self._initial_interval,
+        "next_check": loop.time() + self._initial_interval,
+        "deadline": loop.time() + timeout if timeout else None,
+        "waiters": 0,
+        "polls": 0,
+      }
+      self._operations[operation_id] = entry
+      self._start()
+
+    entry["waiters"] += 1
+    try:
+      return await asyncio.shield(entry["future"])
+    except asyncio.CancelledError:
+      if not entry["future"].done():
+        entry["waiters"] -= 1
+        if entry["waiters"] == 0:
+          self._operations.pop(operation_id, None)
+          entry["future"].cancel()
+      raise
+
+  def close(self):
+    """Stop polling and cancel every outstanding operation wait."""
+    if self._task:
+      self._task.cancel()
+      self._task = None
+
+    for entry in self._operations.values():
+      entry["future"].cancel()
+
+    self._operations.clear()
+
+  def _start(self):
+    """Start the polling task or wake it for a new operation."""
+    if self._task is None or self._task.done():
+      self._wakeup = asyncio.Event()
+      self._task = asyncio.get_running_loop().create_task(self._run())
+    else:
+      self._wakeup.set()
+
+  async def _run(self):
+    """Check every due operation, then sleep until the next one is due."""
+    loop = asyncio.get_running_loop()
+
+    while self._operations:
+      now = loop.time()
+      due = [
+        operation_id for operation_id, entry in self._operations.items()
+        if entry["next_check"] <= now
+      ]
+
+      if due:
+        results = await asyncio.gather(
+          *[self._check_operation(operation_id) for operation_id in due],
+          return_exceptions=True,
+        )
+        for operation_id, result in zip(due, results):
+          self._update(operation_id, result, loop.time())
+
+      now = loop.time()
+      for operation_id, entry in list(self._operations.items()):
+        if entry["deadline"] and now >= entry["deadline"]:
+          self._finish(operation_id, error=asyncio.TimeoutError(
+            f"Operation {operation_id} did not finish in time."
+          ))
+
+      if not self._operations:
+        break
+
+      wake_at = min(
+        min(entry["next_check"], entry["deadline"] or entry["next_check"])
+        for entry in self._operations.values()
+      )
+
+      self._wakeup.clear()
+      try:
+        await asyncio.wait_for(self._wakeup.wait(), max(0, wake_at - loop.time()))
+      except asyncio.TimeoutError:
+        pass
+
+  def _update(self, operation_id:str, result, now:float):
+    """Resolve an operation from its latest status or schedule the next check."""
+    entry = self._operations.get(operation_id)
+    if entry is None:
+      return
+
+    entry["polls"] += 1
+
+    if isinstance(result, BaseException):
+      self._finish(operation_id, error=result)
+      return
+
+    state = result.get("operationState") if isinstance(result, dict) else None
+
+    if state in OPERATION_DONE_STATES:
+      self._finish(operation_id, result=result)
+    elif state in OPERATION_FAILED_STATES:
+      self._finish(operation_id, error=GoogleWifiException(
+        f"Operation {operation_id} ended in state {state}."
+      ))
+    elif not state:
+      self._finish(operation_id, error=GoogleWifiException(
+        f"Operation {operation_id} returned no state: {result}"
+      ))
+    else:
+      entry["next_check"] = now + entry["interval"]
+      entry["interval"] = min(entry["interval"] * self._backoff, self._max_interval)
+
+  def _finish(self, operation_id:str, result=None, error:Exception=None):
+    """Complete the shared future of an operation."""
+    entry = self._operations.pop(operation_id, None)
+    if entry is None or entry["future"].done():
+      return
+
+    if self._metrics is not None:
+      self._metrics.observe_polls(entry["polls"], "error" if error else "done")
+
+    if error:
+      entry["future"].set_exception(error)
+    else:
+      entry["future"].set_result(result)
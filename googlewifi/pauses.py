@@ -0,0 +1,95 @@
+"""Expiry index of paused stations."""
+import asyncio
+import heapq
+import time
+
+from .helpers import _policy_expiry
+
+class PauseSchedule:
+  """Index paused stations by expiry and flip them back on time."""
+
+  def __init__(self, on_expire):
+    """Set up the schedule with an on_expire(system_id, station_id) callback."""
+    self._on_expire = on_expire
+    self._expiries = {}
+    self._heap = []
+    self._timer = None
+
+  def update(self, system_id:str, blocking_policies:dict):
+    """Replace the blocking policies of one system."""
+    now = time.time()
+    previous = self._expiries.get(system_id, {})
+    expiries = {}
+
+    for station_id, blocking_policy in blocking_policies.items():
+      expiry = _policy_expiry(blocking_policy)
+      expiries[station_id] = expiry
+
+      if expiry > now and previous.get(station_id) != expiry:
+        heapq.heappush(self._heap, (expiry, system_id, station_id))
+
+    self._expiries[system_id] = expiries
+    self._arm()
+
+  def retain(self, system_ids):
+    """Forget the blocking policies of systems that are not in system_ids."""
+    for system_id in list(self._expiries):
+      if system_id not in system_ids:
+        del self._expiries[system_id]
+
+  def is_paused(self, system_id:str, station_id:str):
+    """Return True if a station is paused right now."""
+    expiry = self._expiries.get(system_id, {}).get(station_id)
+
+    if expiry is None:
+      return False
+
+    return expiry == 0 or expiry > time.time()
+
+  def next_expiry(self):
+    """Return the next expiry as a Unix timestamp, or None."""
+    self._discard_stale()
+
+    return self._heap[0][0] if self._heap else None
+
+  def close(self):
+    """Cancel the pending expiry timer."""
+    if self._timer:
+      self._timer.cancel()
+      self._timer = None
+
+  def _discard_stale(self):
+    """Drop heap entries whose policy was replaced or removed."""
+    while self._heap:
+      expiry, system_id, station_id = self._heap[0]
+      if self._expiries.get(system_id, {}).get(station_id) == expiry:
+        break
+      heapq.heappop(self._heap)
+
+  def _arm(self):
+    """Schedule a timer for the earliest expiry."""
+    try:
+      loop = asyncio.get_running_loop()
+    except RuntimeError:
+      return
+
+    self.close()
+    next_expiry = self.next_expiry()
+
+    if next_expiry is not None:
+      self._timer = loop.call_at(loop.time() + max(0, next_expiry - time.time()), self._expire)
+
+  def _expire(self):
+    """Flip every station whose pause has expired and re-arm the timer."""
+    self._timer = None
+    now = time.time()
+
+    while True:
+      self._discard_stale()
+      if not self._heap or self._heap[0][0] > now:
+        break
+
+      expiry, system_id, station_id = heapq.heappop(self._heap)
+      self._on_expire(system_id, station_id)
+
+    self._arm()
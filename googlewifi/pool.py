@@ -0,0 +1,201 @@
+"""Many GoogleWifi accounts over one connection pool."""
+import asyncio
+import time
+
+import aiohttp
+
+from .client import GoogleWifi
+from .const import DNS_CACHE_TTL, KEEPALIVE_TIMEOUT
+from .exceptions import GoogleWifiException
+from .helpers import _collect_outcomes
+from .limits import FairLimiter, TokenBucket
+
+# GoogleWifi options the pool sets itself for every client.
+_POOL_OPTIONS = {
+  "limiter": "max_requests and account_requests",
+  "max_concurrency": "account_concurrency",
+}
+
+class GoogleWifiPool:
+  """Many Google Wifi accounts sharing one connection pool and request budget."""
+
+  def __init__(
+    self,
+    session:aiohttp.ClientSession = None,
+    max_requests:int = 32,
+    account_requests:int = 4,
+    account_concurrency:int = 2,
+    refresh_timeout:float = None,
+    connection_limit:int = 100,
+    connection_limit_per_host:int = 32,
+    **client_options,
+    ):
+    """Set up an empty pool; client_options are passed to every GoogleWifi.
+
+    rate_limits in client_options builds one set of token buckets that every
+    account in the pool draws from. A state_path must contain "{account_id}",
+    so each account keeps its own state file.
+    """
+    for option, pool_option in _POOL_OPTIONS.items():
+      if option in client_options:
+        raise TypeError(f"GoogleWifiPool sets {option} for its clients, use {pool_option} instead.")
+
+    if "{account_id}" not in (client_options.get("state_path") or "{account_id}"):
+      raise TypeError('GoogleWifiPool needs a state_path with "{account_id}" in it, one file per account.')
+
+    client_options["rate_limits"] = {
+      endpoint_class: limit if isinstance(limit, TokenBucket) else TokenBucket(*limit)
+      for endpoint_class, limit in (client_options.get("rate_limits") or {}).items()
+    }
+
+    self._session = session
+    self._own_session = session is None
+    self._connection_limit = connection_limit
+    self._connection_limit_per_host = connection_limit_per_host
+    self._limiter = FairLimiter(max_requests, account_requests)
+    self._account_concurrency = account_concurrency
+    self._refresh_timeout = refresh_timeout
+    self._client_options = client_options
+    self._clients = {}
+    self._health = {}
+    self.last_refresh_seconds = None
+
+  def __len__(self):
+    """Return the number of accounts."""
+    return len(self._clients)
+
+  def add_account(self, account_id:str, refresh_token:str):
+    """Add an account and return its GoogleWifi client."""
+    if account_id in self._clients:
+      raise GoogleWifiException(f"Account {account_id} is already in the pool.")
+
+    client_options = dict(self._client_options)
+    if client_options.get("state_path"):
+      client_options["state_path"] = client_options["state_path"].format(account_id=account_id)
+
+    client = GoogleWifi(
+      refresh_token,
+      session=self._session,
+      max_concurrency=self._account_concurrency,
+      limiter=self._limiter.account(account_id),
+      **client_options,
+    )
+    client._own_session = False
+    client._session_factory = self._client_session
+
+    self._clients[account_id] = client
+    self._health[account_id] = {
+      "last_success": None,
+      "last_error": None,
+      "failures": 0,
+      "duration": None,
+    }
+    return client
+
+  async def remove_account(self, account_id:str):
+    """Remove an account and stop its background work."""
+    client = self._clients.pop(account_id, None)
+    self._health.pop(account_id, None)
+
+    if client is not None:
+      await client.close()
+
+  def client(self, account_id:str):
+    """Return the GoogleWifi client of an account."""
+    return self._clients[account_id]
+
+  async def refresh(self, account_ids:list = None, method:str = "get_systems"):
+    """Call method on every account, or on account_ids, and collect results and errors.
+
+    Requests from all accounts share max_requests slots, at most account_requests
+    per account, and waiting accounts are served in turn so none is starved.
+    """
+    if account_ids is None:
+      account_ids = list(self._clients)
+
+    started = time.monotonic()
+
+    async def run(account_id):
+      client = self._clients[account_id]
+      health = self._health[account_id]
+      account_started = time.monotonic()
+
+      try:
+        if self._refresh_timeout is None:
+          result = await getattr(client, method)()
+        else:
+          result = await asyncio.wait_for(getattr(client, method)(), self._refresh_timeout)
+      except Exception as error:
+        health["last_error"] = error
+        health["failures"] += 1
+        raise
+      finally:
+        health["duration"] = time.monotonic() - account_started
+
+      health["last_success"] = time.time()
+      health["last_error"] = None
+      health["failures"] = 0
+      return result
+
+    outcomes = await asyncio.gather(
+      *[run(account_id) for account_id in account_ids], return_exceptions=True
+    )
+    self.last_refresh_seconds = time.monotonic() - started
+
+    return _collect_outcomes(account_ids, outcomes)
+
+  def health(self):
+    """Return aggregate health of the pool and the errors of failing accounts."""
+    failing = {
+      account_id: health["last_error"]
+      for account_id, health in self._health.items()
+      if health["last_error"] is not None
+    }
+    durations = [
+      health["duration"] for health in self._health.values() if health["duration"] is not None
+    ]
+
+    return {
+      "accounts": len(self._clients),
+      "healthy": sum(
+        1 for health in self._health.values()
+        if health["last_success"] is not None and health["last_error"] is None
+      ),
+      "failing": len(failing),
+      "never_refreshed": sum(
+        1 for health in self._health.values()
+        if health["last_success"] is None and health["last_error"] is None
+      ),
+      "in_flight": self._limiter.active,
+      "queued": self._limiter.waiting,
+      "slowest_account_seconds": max(durations) if durations else None,
+      "last_refresh_seconds": self.last_refresh_seconds,
+      "errors": failing,
+    }
+
+  def account_health(self, account_id:str):
+    """Return the health record of one account."""
+    return dict(self._health[account_id])
+
+  async def close(self):
+    """Close every client and the shared session if it was created here."""
+    for client in self._clients.values():
+      await client.close()
+
+    if self._own_session and self._session:
+      await self._session.close()
+      self._session = None
+
+  def _client_session(self):
+    """Return the shared session, creating a pooled one on first use."""
+    if self._session is None:
+      connector = aiohttp.TCPConnector(
+        limit=self._connection_limit,
+        limit_per_host=self._connection_limit_per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        ssl=False,
+      )
+      self._session = aiohttp.ClientSession(connector=connector)
+
+    return self._session
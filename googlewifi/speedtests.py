@@ -0,0 +1,81 @@
+"""Compact per-system speed test history."""
+from .const import SPEED_TEST_FIELDS, SPEED_TEST_HISTORY
+from .helpers import _parse_timestamp
+from .traffic import RingBuffer, _numpy
+
+class SpeedTestHistory:
+  """Speed test results of every system, kept in fixed-size ring buffers."""
+
+  def __init__(self, capacity:int = SPEED_TEST_HISTORY):
+    """Set up an empty history keeping capacity results per system."""
+    self.capacity = capacity
+    self._systems = {}
+
+  def record(self, system_id:str, results:list):
+    """Add speedTestResults entries, skipping the ones already kept."""
+    series = self._systems.get(system_id)
+
+    if series is None:
+      series = self._systems[system_id] = RingBuffer(self.capacity, SPEED_TEST_FIELDS)
+
+    samples = {}
+    for result in results or []:
+      try:
+        timestamp = _parse_timestamp(result["timestamp"]).timestamp()
+        data = result.get("speedTestResultData", {})
+        samples[timestamp] = tuple(float(data.get(field, 0)) for field in SPEED_TEST_FIELDS)
+      except (KeyError, TypeError, ValueError):
+        continue
+
+    if not samples:
+      return
+
+    latest = series.latest()
+
+    if latest is not None and min(samples) <= latest:
+      # Older results arrived, as with a deeper fetch: merge and rebuild the buffer.
+      kept = series.query()
+      merged = {
+        float(timestamp): tuple(float(kept[field][index]) for field in SPEED_TEST_FIELDS)
+        for index, timestamp in enumerate(kept["timestamp"])
+      }
+      merged.update(samples)
+      samples = merged
+      series = self._systems[system_id] = RingBuffer(self.capacity, SPEED_TEST_FIELDS)
+
+    for timestamp in sorted(samples)[-self.capacity:]:
+      series.append(timestamp, samples[timestamp])
+
+  def query(self, system_id:str, start:float=None, end:float=None):
+    """Return the results of a system between start and end, or None."""
+    series = self._systems.get(system_id)
+
+    if series is None:
+      return None
+
+    return series.query(start, end)
+
+  def summary(self, system_id:str, start:float=None, end:float=None):
+    """Return the count and the mean, min and max of each field between start and end."""
+    samples = self.query(system_id, start, end)
+
+    if not samples or not len(samples["timestamp"]):
+      return None
+
+    numpy = _numpy()
+    summary = {"count": len(samples["timestamp"])}
+
+    for field in SPEED_TEST_FIELDS:
+      values = samples[field]
+      if numpy is not None:
+        summary[field] = {"mean": float(values.mean()), "min": float(values.min()), "max": float(values.max())}
+      else:
+        summary[field] = {"mean": sum(values) / len(values), "min": min(values), "max": max(values)}
+
+    return summary
+
+  def retain_systems(self, system_ids):
+    """Forget the systems that are not in system_ids."""
+    for system_id in list(self._systems):
+      if system_id not in system_ids:
+        del self._systems[system_id]
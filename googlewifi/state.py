@@ -0,0 +1,75 @@
+"""On-disk warm-start state: the last snapshot, station MACs and token expiry."""
+import json
+import os
+import tempfile
+
+try:
+  import msgpack
+except ImportError:
+  msgpack = None
+
+STATE_VERSION = 1
+
+class StateStore:
+  """Read and atomically write client state, as msgpack when it is installed or JSON."""
+
+  def __init__(self, path:str):
+    """Keep the path of the state file."""
+    self.path = path
+
+  def load(self):
+    """Return the saved state, or None if there is none or it cannot be read."""
+    try:
+      with open(self.path, "rb") as handle:
+        data = handle.read()
+    except OSError:
+      return None
+
+    try:
+      state = self.decode(data)
+    except (ValueError, TypeError):
+      return None
+
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+      return None
+
+    return state
+
+  def encode(self, state:dict):
+    """Serialize a state dict."""
+    state = dict(state, version=STATE_VERSION)
+
+    if msgpack is not None:
+      return msgpack.packb(state, use_bin_type=True)
+
+    return json.dumps(state, separators=(",", ":")).encode()
+
+  def decode(self, data:bytes):
+    """Deserialize a state file written as msgpack or JSON."""
+    if data[:1] == b"{":
+      return json.loads(data)
+
+    if msgpack is None:
+      raise ValueError("The state file is msgpack but msgpack is not installed.")
+
+    return msgpack.unpackb(data, raw=False)
+
+  def save(self, state:dict):
+    """Serialize a state dict and replace the state file with it."""
+    self.write(self.encode(state))
+
+  def write(self, data:bytes):
+    """Replace the state file with data, readable by the current user only."""
+    directory = os.path.dirname(os.path.abspath(self.path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".googlewifi-")
+
+    try:
+      if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o600)
+      with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+      os.replace(temporary, self.path)
+    except BaseException:
+      if os.path.exists(temporary):
+        os.unlink(temporary)
+      raise
@@ -0,0 +1,361 @@
+"""Realtime traffic streams and the in-process traffic history."""
+import array
+import asyncio
+import functools
+import time
+
+from .const import HISTORY_CAPACITY, HISTORY_RESOLUTIONS, METRICS_STREAM_BUFFER, TRAFFIC_FIELDS
+from .exceptions import UPDATE_ERRORS
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+  """Return numpy if it is installed, importing it on first use."""
+  try:
+    import numpy
+  except ImportError:
+    return None
+
+  return numpy
+
+def _traffic_rates(traffic:dict, previous:dict, elapsed:float):
+  """Return a traffic payload as numbers with deltas and rates against the previous sample.
+
+  *SpeedBps fields are gauges and only get a delta. *Bytes fields are counters and
+  get a delta and a per-second rate; a counter below its previous value has been
+  reset, so its whole value is the delta.
+  """
+  rates = {}
+
+  for field, value in traffic.items():
+    try:
+      value = int(value)
+    except (TypeError, ValueError):
+      continue
+
+    rates[field] = value
+    last = previous.get(field) if previous else None
+
+    if last is None:
+      continue
+
+    if field.endswith("Bytes"):
+      delta = value - last if value >= last else value
+      rates[f"{field}Delta"] = delta
+      rates[f"{field}PerSecond"] = delta / elapsed if elapsed else 0.0
+    else:
+      rates[f"{field}Delta"] = value - last
+
+  return rates
+
+class MetricsStream:
+  """Poll the realtime metrics of one system and fan samples out to subscribers."""
+
+  def __init__(self, client, system_id:str, interval:float):
+    """Set up an idle stream; polling starts with the first subscriber."""
+    self._client = client
+    self.system_id = system_id
+    self.interval = interval
+    self.last_error = None
+    self._subscribers = []
+    self._task = None
+    self._previous = None
+    self._previous_at = None
+
+  def subscribe(self):
+    """Return a queue that receives every new sample."""
+    queue = asyncio.Queue(METRICS_STREAM_BUFFER)
+    self._subscribers.append(queue)
+
+    if self._task is None:
+      self._task = asyncio.get_running_loop().create_task(self._run())
+
+    return queue
+
+  def unsubscribe(self, queue):
+    """Stop delivering to a queue and return True if polling stopped with it."""
+    if queue in self._subscribers:
+      self._subscribers.remove(queue)
+
+    if self._subscribers:
+      return False
+
+    self.close()
+    return True
+
+  def close(self):
+    """Stop polling and end every subscriber with a None sample."""
+    if self._task:
+      self._task.cancel()
+      self._task = None
+
+    self._publish(None)
+    self._subscribers.clear()
+
+  async def _run(self):
+    """Fetch a sample every interval, keeping the cadence steady."""
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+
+    try:
+      while True:
+        try:
+          payload = await self._client.get_realtime_metrics(self.system_id)
+        except UPDATE_ERRORS as error:
+          self.last_error = error
+        else:
+          if payload is not None:
+            self.last_error = None
+            self._publish(self._sample(payload))
+
+        next_tick += self.interval * self._client.throttle_factor
+        await asyncio.sleep(max(0, next_tick - loop.time()))
+    except asyncio.CancelledError:
+      raise
+    except Exception as error:
+      self._task = None
+      self._publish(error)
+
+  def _sample(self, payload:dict):
+    """Turn a metrics payload into a sample with deltas against the previous one."""
+    now = time.monotonic()
+    previous = self._previous
+    elapsed = now - self._previous_at if previous else None
+    previous_stations = previous["stations"] if previous else {}
+
+    stations = {}
+    for this_station in payload.get("stationMetrics", []):
+      station_id = this_station["station"]["id"]
+      stations[station_id] = _traffic_rates(
+        this_station.get("traffic",{}), previous_stations.get(station_id), elapsed
+      )
+
+    sample = {
+      "system_id": self.system_id,
+      "timestamp": time.time(),
+      "elapsed": elapsed,
+      "group": _traffic_rates(
+        payload.get("groupTraffic") or {}, previous["group"] if previous else None, elapsed
+      ),
+      "stations": stations,
+    }
+
+    self._previous = sample
+    self._previous_at = now
+    return sample
+
+  def _publish(self, sample):
+    """Put a sample on every queue, dropping the oldest one of a full queue."""
+    for queue in self._subscribers:
+      if queue.full():
+        queue.get_nowait()
+      queue.put_nowait(sample)
+
+class RingBuffer:
+  """Fixed number of timestamped samples kept in preallocated double arrays."""
+
+  __slots__ = ("capacity", "fields", "timestamps", "columns", "start", "size")
+
+  def __init__(self, capacity:int, fields:tuple):
+    """Allocate room for capacity samples of the given fields."""
+    self.capacity = capacity
+    self.fields = fields
+    self.timestamps = array.array("d", bytes(8 * capacity))
+    self.columns = [array.array("d", bytes(8 * capacity)) for _ in fields]
+    self.start = 0
+    self.size = 0
+
+  @property
+  def nbytes(self):
+    """Return the memory held by the arrays."""
+    return 8 * self.capacity * (len(self.fields) + 1)
+
+  def latest(self):
+    """Return the newest timestamp, or None."""
+    if not self.size:
+      return None
+
+    return self.timestamps[(self.start + self.size - 1) % self.capacity]
+
+  def append(self, timestamp:float, values:tuple):
+    """Add a sample, overwriting the oldest one when full."""
+    index = (self.start + self.size) % self.capacity
+    self.timestamps[index] = timestamp
+    for column, value in zip(self.columns, values):
+      column[index] = value
+
+    if self.size < self.capacity:
+      self.size += 1
+    else:
+      self.start = (self.start + 1) % self.capacity
+
+  def query(self, start:float=None, end:float=None):
+    """Return the timestamps and fields of samples between start and end, inclusive.
+
+    The values are numpy arrays when numpy is installed, else array('d') copies.
+    """
+    first = 0 if start is None else self._search(start, False)
+    last = self.size if end is None else self._search(end, True)
+    last = max(first, last)
+
+    result = {"timestamp": self._window(self.timestamps, first, last)}
+    for field, column in zip(self.fields, self.columns):
+      result[field] = self._window(column, first, last)
+
+    return result
+
+  def _search(self, timestamp:float, right:bool):
+    """Return the logical index where timestamp would be inserted."""
+    low, high = 0, self.size
+
+    while low < high:
+      middle = (low + high) // 2
+      value = self.timestamps[(self.start + middle) % self.capacity]
+      if value < timestamp or (right and value == timestamp):
+        low = middle + 1
+      else:
+        high = middle
+
+    return low
+
+  def _window(self, column, first:int, last:int):
+    """Copy the logical range first:last of a column in chronological order."""
+    numpy = _numpy()
+
+    if numpy is not None:
+      column = numpy.frombuffer(column, dtype=numpy.float64)
+
+    begin = self.start + first
+    end = self.start + last
+
+    if end <= self.capacity:
+      chunk = column[begin:end]
+    elif begin >= self.capacity:
+      chunk = column[begin - self.capacity:end - self.capacity]
+    elif numpy is not None:
+      return numpy.concatenate((column[begin:], column[:end - self.capacity]))
+    else:
+      return column[begin:] + column[:end - self.capacity]
+
+    return chunk.copy() if numpy is not None else chunk
+
+class TrafficSeries:
+  """Raw, per-minute and per-hour traffic of one station or group."""
+
+  __slots__ = ("tiers", "_buckets")
+
+  def __init__(self, capacity:dict):
+    """Allocate one ring buffer per resolution."""
+    self.tiers = {
+      resolution: RingBuffer(capacity[resolution], TRAFFIC_FIELDS)
+      for resolution in HISTORY_RESOLUTIONS
+    }
+    self._buckets = {}
+
+  @property
+  def nbytes(self):
+    """Return the memory held by the ring buffers."""
+    return sum(tier.nbytes for tier in self.tiers.values())
+
+  def record(self, timestamp:float, values:tuple):
+    """Add a raw sample and fold it into the running minute and hour averages."""
+    latest = self.tiers["raw"].latest()
+    if latest is not None and timestamp < latest:
+      return
+
+    self.tiers["raw"].append(timestamp, values)
+
+    for resolution, seconds in HISTORY_RESOLUTIONS.items():
+      if not seconds:
+        continue
+
+      bucket = timestamp - timestamp % seconds
+      current = self._buckets.get(resolution)
+
+      if current is not None and current[0] != bucket:
+        self.tiers[resolution].append(
+          current[0], tuple(total / current[2] for total in current[1])
+        )
+        current = None
+
+      if current is None:
+        current = self._buckets[resolution] = [bucket, [0.0] * len(values), 0]
+
+      for index, value in enumerate(values):
+        current[1][index] += value
+      current[2] += 1
+
+class TrafficHistory:
+  """Bounded traffic history of every group and station, fed from realtime metrics."""
+
+  def __init__(self, capacity:dict=None):
+    """Set up an empty history with the number of samples kept per resolution."""
+    self.capacity = dict(HISTORY_CAPACITY, **(capacity or {}))
+    self._systems = {}
+
+  @property
+  def nbytes(self):
+    """Return the memory held by every ring buffer."""
+    return sum(
+      series.nbytes for system in self._systems.values() for series in system.values()
+    )
+
+  def record(self, system_id:str, system_metrics:dict, timestamp:float=None):
+    """Add the group and station traffic of a realtime metrics payload."""
+    if timestamp is None:
+      timestamp = time.time()
+
+    system = self._systems.setdefault(system_id, {})
+    self._series(system, None).record(timestamp, _traffic_values(system_metrics.get("groupTraffic")))
+
+    for this_station in system_metrics.get("stationMetrics") or []:
+      self._series(system, this_station["station"]["id"]).record(
+        timestamp, _traffic_values(this_station.get("traffic"))
+      )
+
+  def query(
+    self,
+    system_id:str,
+    station_id:str=None,
+    start:float=None,
+    end:float=None,
+    resolution:str="raw",
+    ):
+    """Return the samples of a station, or of the group without a station_id, or None."""
+    if resolution not in HISTORY_RESOLUTIONS:
+      raise ValueError(f"Unknown resolution {resolution}")
+
+    series = self._systems.get(system_id, {}).get(station_id)
+
+    if series is None:
+      return None
+
+    return series.tiers[resolution].query(start, end)
+
+  def retain(self, system_id:str, station_ids):
+    """Forget the stations of a system that are not in station_ids."""
+    system = self._systems.get(system_id, {})
+
+    for station_id in list(system):
+      if station_id is not None and station_id not in station_ids:
+        del system[station_id]
+
+  def retain_systems(self, system_ids):
+    """Forget the systems that are not in system_ids."""
+    for system_id in list(self._systems):
+      if system_id not in system_ids:
+        del self._systems[system_id]
+
+  def _series(self, system:dict, station_id:str):
+    """Return the series of a station or group, creating it if needed."""
+    series = system.get(station_id)
+
+    if series is None:
+      series = system[station_id] = TrafficSeries(self.capacity)
+
+    return series
+
+def _traffic_values(traffic:dict):
+  """Return the TRAFFIC_FIELDS of a traffic payload as floats."""
+  traffic = traffic or {}
+
+  return tuple(float(traffic.get(field, 0)) for field in TRAFFIC_FIELDS)
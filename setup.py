@@ -28,4 +28,5 @@ setuptools.setup(
     ],
     python_requires='>=3.8',
     install_requires=['ghome-foyer-api>=1.0.0,<2.0.0'],
+    extras_require={'fast': ['orjson', 'msgpack'], 'history': ['numpy']},
 )
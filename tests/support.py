@@ -0,0 +1,27 @@
+"""Helpers shared by the tests: a GoogleWifi client wired to the fake Foyer API."""
+import contextlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from googlewifi import GoogleWifi
+from fake_foyer import FakeFoyer
+
+@contextlib.asynccontextmanager
+async def fake_client(client_options:dict = None, **fake_options):
+  """Serve a FakeFoyer and yield it with a GoogleWifi client pointed at it."""
+  fake = FakeFoyer(seed=1, **fake_options)
+  await fake.start()
+  client = fake.configure(GoogleWifi("fake-refresh-token", **(client_options or {})))
+
+  try:
+    yield fake, client
+  finally:
+    await client.close()
+    await fake.stop()
+
+def requests_to(fake:FakeFoyer, suffix:str):
+  """Return how many requests the fake served on routes ending with suffix."""
+  return sum(count for route, count in fake.requests.items() if route.endswith(suffix))
@@ -0,0 +1,68 @@
+"""TokenManager renewal and local Google Home tokens."""
+import asyncio
+from types import SimpleNamespace
+
+from support import fake_client, requests_to
+
+def test_concurrent_calls_authenticate_once():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      await asyncio.gather(*[client.get_status("system-0") for _ in range(5)])
+
+      assert requests_to(fake, "/oauth2/v4/token") == 1
+      assert requests_to(fake, "/v1/issuetoken") == 1
+
+  asyncio.run(scenario())
+
+def test_rejected_token_is_renewed_once_and_retried():
+  async def scenario():
+    async with fake_client({"coalesce": False}) as (fake, client):
+      await client.connect()
+      stale_token = client._tokens.api_token
+      fake.revoked_tokens.add(stale_token)
+
+      results = await asyncio.gather(*[client.get_status("system-0") for _ in range(5)])
+
+      assert all(result["wanConnectionStatus"] == "ONLINE" for result in results)
+      assert client._tokens.api_token != stale_token
+      assert requests_to(fake, "/v1/issuetoken") == 2
+      assert requests_to(fake, "/oauth2/v4/token") == 1
+
+  asyncio.run(scenario())
+
+def test_renewed_token_is_reused_by_later_calls():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      await client.connect()
+      fake.revoked_tokens.add(client._tokens.api_token)
+      await client.get_status("system-0")
+
+      await client.get_status("system-0")
+
+      assert requests_to(fake, "/v1/issuetoken") == 2
+
+  asyncio.run(scenario())
+
+def test_unknown_local_device_does_not_refetch_home_graph():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      calls = []
+
+      async def get_home_graph():
+        calls.append(None)
+        project_info = SimpleNamespace(string2="home-1")
+        device = SimpleNamespace(local_auth_token="local-token", device_info=SimpleNamespace(project_info=project_info))
+        return SimpleNamespace(home=SimpleNamespace(devices=[device]))
+
+      client._get_home_graph = get_home_graph
+
+      assert await client.get_local_token("home-1") == "local-token"
+      for _ in range(3):
+        assert await client.get_local_token("home-2") is None
+      assert len(calls) == 1
+
+      client.invalidate_local_token("home-1")
+      assert await client.get_local_token("home-1") == "local-token"
+      assert len(calls) == 2
+
+  asyncio.run(scenario())
@@ -0,0 +1,116 @@
+"""SingleFlight and request coalescing."""
+import asyncio
+
+import pytest
+
+from googlewifi import SingleFlight
+from support import fake_client, requests_to
+
+class Calls:
+  """A call that counts how often it ran."""
+
+  def __init__(self, delay:float = 0.02, error:Exception = None):
+    self.delay = delay
+    self.error = error
+    self.count = 0
+
+  async def __call__(self):
+    self.count += 1
+    await asyncio.sleep(self.delay)
+    if self.error is not None:
+      raise self.error
+    return {"count": self.count}
+
+def test_concurrent_calls_share_one_run():
+  async def scenario():
+    flight = SingleFlight()
+    call = Calls()
+
+    results = await asyncio.gather(*[flight.run("key", call) for _ in range(5)])
+
+    assert call.count == 1
+    assert all(result is results[0] for result in results)
+
+    await flight.run("key", call)
+    assert call.count == 2
+
+  asyncio.run(scenario())
+
+def test_window_reuses_results_but_not_errors():
+  async def scenario():
+    flight = SingleFlight(window=0.1)
+    call = Calls()
+    await flight.run("key", call)
+    await flight.run("key", call)
+    assert call.count == 1
+
+    await asyncio.sleep(0.15)
+    await flight.run("key", call)
+    assert call.count == 2
+
+    failing = Calls(error=ValueError("boom"))
+    for _ in range(2):
+      with pytest.raises(ValueError):
+        await flight.run("failing", failing)
+    assert failing.count == 2
+
+  asyncio.run(scenario())
+
+def test_call_survives_until_every_waiter_is_cancelled():
+  async def scenario():
+    flight = SingleFlight()
+    call = Calls(delay=0.05)
+
+    first = asyncio.ensure_future(flight.run("key", call))
+    second = asyncio.ensure_future(flight.run("key", call))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert (await second)["count"] == 1
+
+    third = asyncio.ensure_future(flight.run("key", call))
+    await asyncio.sleep(0.01)
+    third.cancel()
+    await asyncio.sleep(0.01)
+    assert not flight.shares("key")
+
+  asyncio.run(scenario())
+
+def test_identical_foyer_reads_share_a_request():
+  async def scenario():
+    async with fake_client(latency=0.05) as (fake, client):
+      await client.connect()
+
+      await asyncio.gather(*[client.get_status("system-0") for _ in range(5)])
+
+      assert requests_to(fake, "/status") == 1
+
+  asyncio.run(scenario())
+
+def test_reads_with_other_credentials_are_not_shared():
+  async def scenario():
+    async with fake_client(latency=0.05) as (fake, client):
+      await client.connect()
+      headers = dict(client._tokens.headers, Authorization="Bearer other-token")
+      url = f"{client.foyer_url}/groups/system-0/status"
+
+      await asyncio.gather(
+        client._request("GET", url, headers=client._tokens.headers),
+        client._request("GET", url, headers=headers),
+      )
+
+      assert requests_to(fake, "/status") == 2
+
+  asyncio.run(scenario())
+
+def test_local_reads_are_not_shared():
+  async def scenario():
+    async with fake_client({"coalesce_window": 10}, latency=0.05) as (fake, client):
+      await asyncio.gather(
+        client.get_bluetooth_status("127.0.0.1", "good"),
+        client.get_bluetooth_status("127.0.0.1", "bogus"),
+      )
+      await client.get_bluetooth_status("127.0.0.1", "good")
+
+      assert requests_to(fake, "/bluetooth/status") == 3
+
+  asyncio.run(scenario())
@@ -0,0 +1,90 @@
+"""GoogleWifiCoordinator refreshes."""
+import asyncio
+
+from googlewifi import GoogleWifiCoordinator
+from support import fake_client
+
+def test_failing_system_keeps_others_fresh():
+  async def scenario():
+    async with fake_client({"retries": 0}, systems=2) as (fake, client):
+      coordinator = GoogleWifiCoordinator(client)
+      await coordinator.refresh("groups")
+      fake.failing.add("/groups/system-1/stations")
+      fake.stations["system-0"].append(dict(fake.stations["system-0"][0], id="system-0-station-new"))
+
+      await coordinator.refresh("stations")
+
+      assert "system-0-station-new" in coordinator.data["system-0"]["devices"]
+      assert "stations" in coordinator.system_errors["system-1"]
+      assert coordinator.data["system-1"]["devices"]
+
+      fake.failing.clear()
+      await coordinator.refresh("stations")
+      assert not coordinator.system_errors["system-1"]
+
+  asyncio.run(scenario())
+
+def test_pause_notifications_are_not_kept():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      coordinator = GoogleWifiCoordinator(client)
+      await coordinator.refresh("groups")
+
+      for _ in range(3):
+        coordinator._pause_expired("system-0", "system-0-station-0")
+      await asyncio.sleep(0)
+      await asyncio.sleep(0)
+
+      assert not coordinator._notify_tasks
+      assert not coordinator._tasks
+
+  asyncio.run(scenario())
+
+def test_system_that_cannot_be_built_does_not_fail_the_others():
+  async def scenario():
+    async with fake_client(systems=3) as (fake, client):
+      del fake.groups["system-1"]["groupSettings"]
+      coordinator = GoogleWifiCoordinator(client)
+
+      await coordinator.refresh("groups")
+
+      assert set(coordinator.data) == {"system-0", "system-2"}
+      assert "build" in coordinator.system_errors["system-1"]
+
+  asyncio.run(scenario())
+
+def test_listener_errors_do_not_stop_refreshes(caplog):
+  async def scenario():
+    async with fake_client() as (fake, client):
+      coordinator = GoogleWifiCoordinator(client)
+      calls = []
+
+      def broken_listener(data, source):
+        calls.append(source)
+        raise KeyError("listener")
+
+      coordinator.subscribe(broken_listener)
+      await coordinator.refresh("groups")
+      await coordinator.refresh("status")
+
+      assert calls[-2:] == ["groups", "status"]
+
+  asyncio.run(scenario())
+  assert "Error in a GoogleWifiCoordinator listener" in caplog.text
+
+def test_systems_removed_since_the_snapshot_are_pruned(tmp_path):
+  path = str(tmp_path / "state")
+
+  async def scenario():
+    async with fake_client({"state_path": path}, systems=2) as (fake, client):
+      await client.get_systems()
+      await asyncio.sleep(0.1)
+
+    async with fake_client({"state_path": path}, systems=1) as (fake, client):
+      coordinator = GoogleWifiCoordinator(client)
+      await coordinator.start()
+      await coordinator.stop()
+
+      assert set(coordinator.data) == {"system-0"}
+
+  asyncio.run(scenario())
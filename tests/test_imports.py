@@ -0,0 +1,19 @@
+"""Lazy imports of the package."""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_modules(statement:str):
+  """Return the heavy modules a statement loads in a fresh interpreter."""
+  code = f"import sys; {statement}; print(' '.join(name for name in ('aiohttp', 'grpc', 'dateutil') if name in sys.modules))"
+  return subprocess.run(
+    [sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True
+  ).stdout.split()
+
+def test_exceptions_do_not_load_aiohttp():
+  assert loaded_modules("from googlewifi import GoogleWifiException, GoogleHomeIgnoreDevice") == []
+
+def test_update_errors_include_aiohttp_errors():
+  assert loaded_modules("from googlewifi import UPDATE_ERRORS") == ["aiohttp"]
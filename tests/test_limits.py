@@ -0,0 +1,118 @@
+"""Retry-After handling, token buckets and the fair limiter."""
+import asyncio
+import time
+
+import pytest
+
+from googlewifi import FairLimiter, GoogleWifiHTTPError, GoogleWifiRateLimited, TokenBucket
+from support import fake_client, requests_to
+
+STATUS = "/v2/groups/system-0/status"
+
+def test_retry_after_is_honored_and_raises_the_throttle():
+  async def scenario():
+    async with fake_client({"retry_backoff": 0}) as (fake, client):
+      await client.connect()
+      fake.scripted[STATUS].append((429, 1))
+
+      started = time.monotonic()
+      response = await client.get_status("system-0")
+
+      assert response["wanConnectionStatus"] == "ONLINE"
+      assert time.monotonic() - started >= 1
+      assert client.throttle_factor > 1
+      assert requests_to(fake, "/status") == 2
+
+  asyncio.run(scenario())
+
+def test_long_retry_after_fails_at_once():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      await client.connect()
+      fake.scripted[STATUS].append((429, 120))
+
+      with pytest.raises(GoogleWifiRateLimited) as error:
+        await client.get_status("system-0")
+
+      assert error.value.retry_after == 120
+      assert requests_to(fake, "/status") == 1
+
+  asyncio.run(scenario())
+
+def test_server_errors_are_retried_then_raised():
+  async def scenario():
+    async with fake_client({"retries": 1, "retry_backoff": 0}) as (fake, client):
+      await client.connect()
+      fake.scripted[STATUS].extend([(503, None), (503, None)])
+
+      with pytest.raises(GoogleWifiHTTPError) as error:
+        await client.get_status("system-0")
+
+      assert error.value.status == 503
+      assert requests_to(fake, "/status") == 2
+
+      fake.scripted[STATUS].append((404, None))
+      with pytest.raises(GoogleWifiHTTPError):
+        await client.get_status("system-0")
+      assert requests_to(fake, "/status") == 3
+
+  asyncio.run(scenario())
+
+def test_token_bucket_spaces_requests_out():
+  async def scenario():
+    bucket = TokenBucket(rate=20, burst=2)
+
+    started = time.monotonic()
+    for _ in range(6):
+      await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.19
+
+    bucket.pause(0.2)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.19
+
+  asyncio.run(scenario())
+
+def test_fair_limiter_serves_waiting_accounts_in_turn():
+  async def scenario():
+    limiter = FairLimiter(limit=1)
+    order = []
+
+    async def request(key):
+      async with limiter.account(key):
+        order.append(key)
+        await asyncio.sleep(0.01)
+
+    await limiter.acquire("busy")
+    tasks = [asyncio.ensure_future(request("busy")) for _ in range(3)]
+    tasks.append(asyncio.ensure_future(request("quiet")))
+    await asyncio.sleep(0)
+    limiter.release("busy")
+    await asyncio.gather(*tasks)
+
+    assert order == ["busy", "quiet", "busy", "busy"]
+    assert limiter.active == 0 and limiter.waiting == 0
+
+  asyncio.run(scenario())
+
+def test_fair_limiter_caps_each_account():
+  async def scenario():
+    limiter = FairLimiter(limit=4, account_limit=1)
+    running = {"busy": 0}
+    peak = 0
+
+    async def request():
+      nonlocal peak
+      async with limiter.account("busy"):
+        running["busy"] += 1
+        peak = max(peak, running["busy"])
+        await asyncio.sleep(0.01)
+        running["busy"] -= 1
+
+    await asyncio.gather(*[request() for _ in range(4)])
+
+    assert peak == 1
+
+  asyncio.run(scenario())
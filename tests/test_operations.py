@@ -0,0 +1,88 @@
+"""The shared OperationPoller."""
+import asyncio
+
+import pytest
+
+from googlewifi import GoogleWifiException, OperationPoller
+
+class FakeOperations:
+  """check_operation stand-in that finishes each operation after a number of checks."""
+
+  def __init__(self, checks:int = 2, state:str = "DONE"):
+    self.checks = checks
+    self.state = state
+    self.calls = []
+
+  async def check_operation(self, operation_id:str):
+    self.calls.append(operation_id)
+    done = self.calls.count(operation_id) >= self.checks
+    return {"operationId": operation_id, "operationState": self.state if done else "IN_PROGRESS"}
+
+def poller(operations:FakeOperations, **options):
+  return OperationPoller(operations.check_operation, initial_interval=0.01, max_interval=0.02, **options)
+
+def test_waiters_of_one_operation_share_its_polls():
+  async def scenario():
+    operations = FakeOperations(checks=3)
+    this_poller = poller(operations)
+
+    results = await asyncio.gather(*[this_poller.wait("operation-1") for _ in range(5)])
+
+    assert all(result["operationState"] == "DONE" for result in results)
+    assert operations.calls == ["operation-1"] * 3
+    assert this_poller.pending == []
+
+  asyncio.run(scenario())
+
+def test_operations_are_polled_together():
+  async def scenario():
+    operations = FakeOperations(checks=2)
+    this_poller = poller(operations)
+
+    await asyncio.gather(*[this_poller.wait(f"operation-{number}") for number in range(10)])
+
+    assert len(operations.calls) == 20
+
+  asyncio.run(scenario())
+
+def test_cancelling_one_waiter_keeps_the_operation_for_the_others():
+  async def scenario():
+    operations = FakeOperations(checks=5)
+    this_poller = poller(operations)
+
+    first = asyncio.ensure_future(this_poller.wait("operation-1"))
+    second = asyncio.ensure_future(this_poller.wait("operation-1"))
+    await asyncio.sleep(0.005)
+    first.cancel()
+
+    assert (await second)["operationState"] == "DONE"
+    assert first.cancelled()
+
+  asyncio.run(scenario())
+
+def test_cancelling_every_waiter_stops_polling():
+  async def scenario():
+    operations = FakeOperations(checks=1000)
+    this_poller = poller(operations)
+
+    waiter = asyncio.ensure_future(this_poller.wait("operation-1"))
+    await asyncio.sleep(0.03)
+    waiter.cancel()
+    await asyncio.sleep(0.03)
+    calls = len(operations.calls)
+    await asyncio.sleep(0.05)
+
+    assert this_poller.pending == []
+    assert len(operations.calls) == calls
+
+  asyncio.run(scenario())
+
+def test_failed_and_slow_operations_raise():
+  async def scenario():
+    with pytest.raises(GoogleWifiException):
+      await poller(FakeOperations(checks=1, state="FAILED")).wait("operation-1")
+
+    with pytest.raises(asyncio.TimeoutError):
+      await poller(FakeOperations(checks=1000)).wait("operation-1", timeout=0.05)
+
+  asyncio.run(scenario())
@@ -0,0 +1,54 @@
+"""Pause expiry on the loop timer."""
+import asyncio
+import time
+
+from googlewifi import GoogleWifiCoordinator
+from support import fake_client
+
+def test_expired_pause_is_reported_as_a_change():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      expiry = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(int(time.time()) + 2))
+      fake.groups["system-0"]["groupSettings"]["familyHubSettings"]["stationPolicies"].append(
+        {"stationId": "system-0-station-0", "blockingPolicy": {"expiryTimestamp": expiry}}
+      )
+
+      await client.get_systems_changes()
+      before = client.cached_systems
+      assert before["system-0"]["devices"]["system-0-station-0"]["paused"] is True
+
+      await asyncio.sleep(3)
+
+      assert client.cached_systems["system-0"]["devices"]["system-0-station-0"]["paused"] is False
+      assert before["system-0"]["devices"]["system-0-station-0"]["paused"] is True
+
+      changes = await client.get_systems_changes()
+      assert changes["systems"]["system-0"]["paused"] == {"system-0-station-0": False}
+
+  asyncio.run(scenario())
+
+def test_coordinator_expiry_leaves_client_snapshots_alone():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      expiry = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(int(time.time()) + 2))
+      fake.groups["system-0"]["groupSettings"]["familyHubSettings"]["stationPolicies"].append(
+        {"stationId": "system-0-station-0", "blockingPolicy": {"expiryTimestamp": expiry}}
+      )
+      # Without station traffic the device dicts are shared with get_systems().
+      fake.overrides["/v2/groups/system-0/realtimeMetrics"] = {"groupTraffic": {}, "stationMetrics": []}
+      coordinator = GoogleWifiCoordinator(client)
+      await coordinator.refresh("groups")
+      coordinator._unsubscribe_pause = client.add_pause_listener(coordinator._pause_expired)
+
+      await client.get_systems_changes()
+      before = client.cached_systems
+
+      await asyncio.sleep(3)
+
+      assert coordinator.data["system-0"]["devices"]["system-0-station-0"]["paused"] is False
+      assert before["system-0"]["devices"]["system-0-station-0"]["paused"] is True
+
+      changes = await client.get_systems_changes()
+      assert changes["systems"]["system-0"]["paused"] == {"system-0-station-0": False}
+
+  asyncio.run(scenario())
@@ -0,0 +1,40 @@
+"""GoogleWifiPool construction."""
+import asyncio
+
+import pytest
+
+from googlewifi import GoogleWifiPool
+
+@pytest.mark.parametrize("option", ["limiter", "max_concurrency"])
+def test_pool_options_are_rejected_as_client_options(option):
+  with pytest.raises(TypeError, match=option):
+    GoogleWifiPool(**{option: None})
+
+def test_rate_limits_are_shared_by_every_account():
+  async def scenario():
+    pool = GoogleWifiPool(rate_limits={"read": (5, 10)})
+    first = pool.add_account("first", "token-1")
+    second = pool.add_account("second", "token-2")
+
+    assert first._buckets["read"] is second._buckets["read"]
+    assert first._buckets["read"].rate == 5
+
+    await pool.close()
+
+  asyncio.run(scenario())
+
+def test_each_account_gets_its_own_state_path(tmp_path):
+  with pytest.raises(TypeError, match="account_id"):
+    GoogleWifiPool(state_path=str(tmp_path / "state"))
+
+  async def scenario():
+    pool = GoogleWifiPool(state_path=str(tmp_path / "{account_id}.state"))
+    first = pool.add_account("first", "token-1")
+    second = pool.add_account("second", "token-2")
+
+    assert first._state_store.path == str(tmp_path / "first.state")
+    assert second._state_store.path == str(tmp_path / "second.state")
+
+    await pool.close()
+
+  asyncio.run(scenario())
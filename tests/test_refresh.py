@@ -0,0 +1,81 @@
+"""Per-system isolation and stale fallback of get_systems()."""
+import asyncio
+
+import pytest
+
+from support import fake_client
+
+def test_malformed_group_does_not_fail_other_systems():
+  async def scenario():
+    async with fake_client(systems=3) as (fake, client):
+      del fake.groups["system-1"]["groupSettings"]
+      fake.groups["system-2"]["groupSettings"]["familyHubSettings"]["stationPolicies"].append(
+        {"stationId": "system-2-station-0"}
+      )
+
+      systems = await client.get_systems()
+
+      assert list(systems) == ["system-0"]
+      assert set(client.system_errors) == {"system-1", "system-2"}
+
+  asyncio.run(scenario())
+
+def test_failed_payload_falls_back_to_last_good():
+  async def scenario():
+    async with fake_client({"retries": 0}, systems=2) as (fake, client):
+      await client.get_systems()
+      fake.failing.add("/groups/system-1/stations")
+
+      systems = await client.get_systems()
+
+      assert "stale" not in systems["system-0"]
+      assert set(systems["system-1"]["stale"]) == {"stations"}
+      assert systems["system-1"]["devices"]
+
+  asyncio.run(scenario())
+
+def test_every_system_failing_raises():
+  async def scenario():
+    async with fake_client(systems=2) as (fake, client):
+      for this_group in fake.groups.values():
+        del this_group["groupSettings"]
+
+      try:
+        await client.get_systems()
+      except Exception as error:
+        assert type(error).__name__ == "GoogleWifiException"
+      else:
+        raise AssertionError("get_systems() did not raise")
+
+  asyncio.run(scenario())
+
+def test_malformed_status_does_not_fail_other_systems():
+  async def scenario():
+    async with fake_client(systems=2) as (fake, client):
+      fake.overrides["/v2/groups/system-1/status"] = {
+        "wanConnectionStatus": "ONLINE",
+        "apStatuses": [{"apState": "AP_ONLINE"}],
+      }
+
+      systems = await client.get_systems()
+
+      assert list(systems) == ["system-0"]
+      assert "system-1" in client.system_errors
+
+  asyncio.run(scenario())
+
+@pytest.mark.parametrize("traffic_history", [False, True])
+def test_malformed_metrics_do_not_fail_other_systems(traffic_history):
+  async def scenario():
+    async with fake_client({"traffic_history": traffic_history}, systems=2) as (fake, client):
+      fake.overrides["/v2/groups/system-1/realtimeMetrics"] = {
+        "groupTraffic": {},
+        "stationMetrics": [{"traffic": {}}],
+      }
+
+      systems = await client.get_systems()
+
+      assert list(systems) == ["system-0"]
+      assert "system-1" in client.system_errors
+
+  asyncio.run(scenario())
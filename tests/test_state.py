@@ -0,0 +1,33 @@
+"""Warm-start state persistence."""
+import asyncio
+import os
+
+from support import fake_client
+
+def test_state_is_saved_in_the_background(tmp_path):
+  path = str(tmp_path / "state")
+
+  async def scenario():
+    async with fake_client({"state_path": path}) as (fake, client):
+      await client.get_systems()
+      await asyncio.sleep(0.1)
+
+      assert os.path.exists(path)
+
+    async with fake_client({"state_path": path}) as (fake, client):
+      assert "system-0" in client.cached_systems
+
+  asyncio.run(scenario())
+
+def test_unwritable_state_path_does_not_fail_refresh(tmp_path, caplog):
+  path = str(tmp_path / "missing" / "state")
+
+  async def scenario():
+    async with fake_client({"state_path": path}) as (fake, client):
+      systems = await client.get_systems()
+      await asyncio.sleep(0.1)
+
+      assert "system-0" in systems
+
+  asyncio.run(scenario())
+  assert "Could not save the state" in caplog.text
@@ -0,0 +1,24 @@
+"""stream_metrics() subscribers."""
+import asyncio
+
+from support import fake_client
+
+def test_closing_the_client_ends_metric_streams():
+  async def scenario():
+    async with fake_client() as (fake, client):
+      samples = []
+
+      async def consume():
+        async for sample in client.stream_metrics("system-0", interval=0.05):
+          samples.append(sample)
+
+      consumers = [asyncio.create_task(consume()) for _ in range(2)]
+      while len(samples) < 2:
+        await asyncio.sleep(0.01)
+
+      await client.close()
+      await asyncio.wait_for(asyncio.gather(*consumers), 1)
+
+      assert not client._metric_streams
+
+  asyncio.run(scenario())